@@ -0,0 +1,19 @@
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261018_0002_cache_versions"
+down_revision = "20250913_0001_init"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "cache_versions",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("resource", sa.String(length=30), primary_key=True),
+        sa.Column("version", sa.Integer, nullable=False, server_default="0"),
+    )
+
+def downgrade() -> None:
+    op.drop_table("cache_versions")
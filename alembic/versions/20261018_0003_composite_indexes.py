@@ -0,0 +1,19 @@
+from __future__ import annotations
+from alembic import op
+
+revision = "20261018_0003_composite_indexes"
+down_revision = "20261018_0002_cache_versions"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_index("ix_tasks_goal_status", "tasks", ["goal_id", "status"])
+    op.create_index("ix_reflections_user_date", "reflections", ["user_id", "date"])
+    op.create_index("ix_suggestions_user_type_date", "suggestions", ["user_id", "type", "date"])
+    op.create_index("ix_integrations_user_kind_key", "integrations", ["user_id", "kind", "key"])
+
+def downgrade() -> None:
+    op.drop_index("ix_integrations_user_kind_key", table_name="integrations")
+    op.drop_index("ix_suggestions_user_type_date", table_name="suggestions")
+    op.drop_index("ix_reflections_user_date", table_name="reflections")
+    op.drop_index("ix_tasks_goal_status", table_name="tasks")
@@ -0,0 +1,41 @@
+from __future__ import annotations
+from alembic import op
+
+revision = "20261018_0004_search_fts"
+down_revision = "20261018_0003_composite_indexes"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS goals_fts USING fts5(
+        title, why, kgi, content='goals', content_rowid='id', tokenize='trigram')""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS goals_fts_ai AFTER INSERT ON goals BEGIN
+        INSERT INTO goals_fts(rowid, title, why, kgi) VALUES (new.id, new.title, new.why, new.kgi);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS goals_fts_ad AFTER DELETE ON goals BEGIN
+        INSERT INTO goals_fts(goals_fts, rowid, title, why, kgi) VALUES ('delete', old.id, old.title, old.why, old.kgi);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS goals_fts_au AFTER UPDATE OF title, why, kgi ON goals BEGIN
+        INSERT INTO goals_fts(goals_fts, rowid, title, why, kgi) VALUES ('delete', old.id, old.title, old.why, old.kgi);
+        INSERT INTO goals_fts(rowid, title, why, kgi) VALUES (new.id, new.title, new.why, new.kgi);
+    END""")
+    op.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        title, content='tasks', content_rowid='id', tokenize='trigram')""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title) VALUES (new.id, new.title);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO tasks_fts(rowid, title) VALUES (new.id, new.title);
+    END""")
+    op.execute("INSERT INTO goals_fts(goals_fts) VALUES ('rebuild')")
+    op.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+
+def downgrade() -> None:
+    for trigger in ("tasks_fts_au", "tasks_fts_ad", "tasks_fts_ai", "goals_fts_au", "goals_fts_ad", "goals_fts_ai"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS tasks_fts")
+    op.execute("DROP TABLE IF EXISTS goals_fts")
@@ -0,0 +1,27 @@
+from __future__ import annotations
+from alembic import op
+
+revision = "20261018_0005_reflections_fts"
+down_revision = "20261018_0004_search_fts"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS reflections_fts USING fts5(
+        text, content='reflections', content_rowid='id', tokenize='trigram')""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS reflections_fts_ai AFTER INSERT ON reflections BEGIN
+        INSERT INTO reflections_fts(rowid, text) VALUES (new.id, new.text);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS reflections_fts_ad AFTER DELETE ON reflections BEGIN
+        INSERT INTO reflections_fts(reflections_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS reflections_fts_au AFTER UPDATE OF text ON reflections BEGIN
+        INSERT INTO reflections_fts(reflections_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO reflections_fts(rowid, text) VALUES (new.id, new.text);
+    END""")
+    op.execute("INSERT INTO reflections_fts(reflections_fts) VALUES ('rebuild')")
+
+def downgrade() -> None:
+    for trigger in ("reflections_fts_au", "reflections_fts_ad", "reflections_fts_ai"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS reflections_fts")
@@ -0,0 +1,25 @@
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261018_0006_reflection_daily"
+down_revision = "20261018_0005_reflections_fts"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "reflection_daily",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("date", sa.Date, primary_key=True),
+        sa.Column("count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("mood_sum", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("latest_id", sa.Integer, nullable=False),
+    )
+    op.execute(
+        "INSERT INTO reflection_daily (user_id, date, count, mood_sum, latest_id)"
+        " SELECT user_id, date, COUNT(*), SUM(mood), MAX(id) FROM reflections GROUP BY user_id, date"
+    )
+
+def downgrade() -> None:
+    op.drop_table("reflection_daily")
@@ -0,0 +1,23 @@
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261018_0007_reflection_digests"
+down_revision = "20261018_0006_reflection_daily"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "reflection_digests",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("date", sa.Date, primary_key=True),
+        sa.Column("count", sa.Integer, nullable=False),
+        sa.Column("latest_id", sa.Integer, nullable=False),
+        sa.Column("kind", sa.String(length=100), nullable=False),
+        sa.Column("digest", sa.Text, nullable=False),
+        sa.Column("created_at", sa.DateTime, nullable=True),
+    )
+
+def downgrade() -> None:
+    op.drop_table("reflection_digests")
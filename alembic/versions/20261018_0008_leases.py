@@ -0,0 +1,19 @@
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261018_0008_leases"
+down_revision = "20261018_0007_reflection_digests"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "leases",
+        sa.Column("name", sa.String(length=100), primary_key=True),
+        sa.Column("owner", sa.String(length=100), nullable=False),
+        sa.Column("expires_at", sa.DateTime, nullable=False),
+    )
+
+def downgrade() -> None:
+    op.drop_table("leases")
@@ -1,9 +1,35 @@
 from __future__ import annotations
+import asyncio
+import contextvars
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import closing
+from typing import Callable, Iterator, List, Sequence, Tuple
+from app.core import llm_cache
+from app.core.circuit import CircuitBreaker
+from app.core.metrics import timed, llm_latency
 
 AI_ENABLED = os.getenv("AI_ENABLED", "false").lower() == "true"
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+LLM_TIMEOUT_SEC = float(os.getenv("LLM_TIMEOUT_SEC", "15"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "0"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_DEADLINE_SEC = float(os.getenv("LLM_DEADLINE_SEC", "8"))
+
+Prompt = Tuple[str, str, int]  # (system, user, max_tokens)
+
+breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "3")),
+    cooldown_sec=float(os.getenv("LLM_BREAKER_COOLDOWN_SEC", "30")),
+)
+
+_client = None
+_client_lock = threading.Lock()
+_executor: ThreadPoolExecutor | None = None
 
 def dummy_generate(system: str, user: str, max_tokens: int = 160) -> str:
     hint = "まず2分だけ、見出しを書き出そう。"
@@ -11,25 +37,146 @@ def dummy_generate(system: str, user: str, max_tokens: int = 160) -> str:
         return "直近の学び: 小さく始めると進む。次は粒度を30分に。改善: 朝に5分で着手タスクを作る。"
     return hint
 
+def _openai_client():
+    """プロセス共有のクライアント。内部のHTTP接続プールを呼び出し間で再利用する。"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, timeout=LLM_TIMEOUT_SEC, max_retries=LLM_MAX_RETRIES)  # type: ignore
+    return _client
+
 def _openai_generate(system: str, user: str, max_tokens: int = 160) -> str:
-    from openai import OpenAI
-    client = OpenAI(api_key=OPENAI_API_KEY)  # type: ignore
-    resp = client.chat.completions.create(
-        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+    resp = _openai_client().chat.completions.create(
+        model=OPENAI_MODEL,
         messages=[{"role": "system", "content": system},{"role": "user", "content": user}],
         temperature=0.3,
         max_tokens=max_tokens,
     )
     return (resp.choices[0].message.content or "").strip()
 
+def _openai_stream(system: str, user: str, max_tokens: int = 160) -> Iterator[str]:
+    stream = _openai_client().chat.completions.create(
+        model=OPENAI_MODEL,
+        messages=[{"role": "system", "content": system},{"role": "user", "content": user}],
+        temperature=0.3,
+        max_tokens=max_tokens,
+        stream=True,
+    )
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        stream.close()  # 途中で閉じられたときもHTTP応答を読み捨てずに切る
+
 def generate_text(system: str, user: str, max_tokens: int = 160) -> str:
     if not AI_ENABLED:
         return dummy_generate(system, user, max_tokens)
     if LLM_PROVIDER == "openai":
         if not OPENAI_API_KEY:
             return dummy_generate(system, user, max_tokens)
+        key = llm_cache.cache_key(LLM_PROVIDER, OPENAI_MODEL, system, user, max_tokens) if llm_cache.LLM_CACHE_ENABLED else None
+        if key:
+            hit = llm_cache.get(key)
+            if hit is not None:
+                return hit
+        if not breaker.allow():
+            return dummy_generate(system, user, max_tokens)
         try:
-            return _openai_generate(system, user, max_tokens)
+            with timed(llm_latency, "llm", kind="generate"):
+                text = _openai_generate(system, user, max_tokens)
         except Exception:
+            breaker.record_failure()
             return dummy_generate(system, user, max_tokens)
+        breaker.record_success()
+        if key and text:
+            llm_cache.put(key, text)
+        return text
     return dummy_generate(system, user, max_tokens)
+
+
+def stream_text(system: str, user: str, max_tokens: int = 160) -> Iterator[str]:
+    """generate_text のストリーミング版。プロバイダのトークン断片を届いた順に返す。
+    キャッシュヒット・フォールバック時は全文を1つの断片として返す。"""
+    if not AI_ENABLED or LLM_PROVIDER != "openai" or not OPENAI_API_KEY:
+        yield dummy_generate(system, user, max_tokens)
+        return
+    key = llm_cache.cache_key(LLM_PROVIDER, OPENAI_MODEL, system, user, max_tokens) if llm_cache.LLM_CACHE_ENABLED else None
+    if key:
+        hit = llm_cache.get(key)
+        if hit is not None:
+            yield hit
+            return
+    if not breaker.allow():
+        yield dummy_generate(system, user, max_tokens)
+        return
+    parts: List[str] = []
+    failed = completed = False
+    try:
+        with timed(llm_latency, "llm", kind="stream") as labels, closing(_openai_stream(system, user, max_tokens)) as pieces:
+            try:
+                for piece in pieces:
+                    parts.append(piece)
+                    yield piece
+            except GeneratorExit:
+                labels["outcome"] = "closed"  # 利用側が途中でやめた(max_tasks に達した・クライアントが切断した)
+                raise
+            completed = True
+    except Exception:
+        failed = True
+        breaker.record_failure()
+        if not parts:
+            yield dummy_generate(system, user, max_tokens)
+        return
+    finally:
+        # 途中で閉じられた(GeneratorExit)ときもブレーカーを確定させる。半開の試行が残ると allow() が False のままになる
+        if not failed:
+            breaker.record_success()
+        # キャッシュは最後まで受け取った応答だけ。途中の断片は generate_text と同じキーで読まれ、壊れた応答になる
+        if completed and key and (text := "".join(parts).strip()):
+            llm_cache.put(key, text)
+
+def _pool() -> ThreadPoolExecutor:
+    """LLM呼び出し専用のスレッドプール。同時実行数を LLM_MAX_CONCURRENCY に制限する。"""
+    global _executor
+    if _executor is None:
+        with _client_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+    return _executor
+
+def generate_many(prompts: Sequence[Prompt], deadline_sec: float | None = None,
+                  fallback: Callable[[str, str, int], str] = dummy_generate) -> List[str]:
+    """複数プロンプトを並列に実行する。deadline_sec までに終わらなかったものは fallback の結果で埋める。"""
+    if not prompts:
+        return []
+    if not AI_ENABLED:
+        return [dummy_generate(*p) for p in prompts]
+    # 呼び出し元のリクエストの計測に載るよう contextvars ごと渡す
+    futs = [_pool().submit(contextvars.copy_context().run, generate_text, *p) for p in prompts]
+    done, _ = wait(futs, timeout=deadline_sec)
+    out: List[str] = []
+    for f, p in zip(futs, prompts):
+        if f in done and f.exception() is None:
+            out.append(f.result())
+        else:
+            f.cancel(); out.append(fallback(*p))
+    return out
+
+async def agenerate_text(system: str, user: str, max_tokens: int = 160, timeout: float | None = None,
+                         fallback: Callable[[str, str, int], str] = dummy_generate) -> str:
+    if not AI_ENABLED:
+        return dummy_generate(system, user, max_tokens)
+    loop = asyncio.get_running_loop()
+    fut = loop.run_in_executor(_pool(), contextvars.copy_context().run, generate_text, system, user, max_tokens)
+    try:
+        return await asyncio.wait_for(fut, timeout)
+    except Exception:
+        return fallback(system, user, max_tokens)
+
+async def agenerate_many(prompts: Sequence[Prompt], deadline_sec: float | None = None,
+                         fallback: Callable[[str, str, int], str] = dummy_generate) -> List[str]:
+    """generate_many の async 版。全体の所要時間は最も遅い1件(上限 deadline_sec)になる。"""
+    return list(await asyncio.gather(*(agenerate_text(*p, timeout=deadline_sec, fallback=fallback) for p in prompts)))
@@ -0,0 +1,48 @@
+from __future__ import annotations
+import threading
+import time
+
+class CircuitBreaker:
+    """連続失敗が閾値に達したら cooldown_sec の間は呼び出しを遮断する。期限後は1件だけ試行(half-open)を通す。"""
+
+    def __init__(self, failure_threshold: int = 3, cooldown_sec: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_sec = cooldown_sec
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.cooldown_sec:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown_sec or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def reset(self) -> None:
+        self.record_success()
@@ -1,24 +1,125 @@
 from __future__ import annotations
+import math
+import os
+import sqlite3
 from pathlib import Path
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
-DB_PATH = Path("storage/app.db")
+DB_PATH = Path(os.getenv("DB_PATH", "storage/app.db"))
 DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH.as_posix()}"
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH.as_posix()}"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    future=True,
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
+# ストレージプロファイル(環境変数で上書き可)
+DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL").upper()
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL").upper()
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "65536"))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_WRITE_POOL_SIZE = int(os.getenv("DB_WRITE_POOL_SIZE", "1"))
+# 同期ルートはスレッドプール(anyio の既定 40)で動き、LLM 待ちの間もセッションを持つことがあるので、それ以上にしておく
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", "40"))  # 0 なら読み書きで同じエンジンを使う
+DB_POOL_TIMEOUT_SEC = float(os.getenv("DB_POOL_TIMEOUT_SEC", "30"))
+DB_ASYNC_POOL_SIZE = int(os.getenv("DB_ASYNC_POOL_SIZE", "5"))
+
+if DB_JOURNAL_MODE not in {"WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"}:
+    raise ValueError(f"unsupported DB_JOURNAL_MODE: {DB_JOURNAL_MODE}")
+if DB_SYNCHRONOUS not in {"OFF", "NORMAL", "FULL", "EXTRA"}:
+    raise ValueError(f"unsupported DB_SYNCHRONOUS: {DB_SYNCHRONOUS}")
+
+def _ln(x):
+    return math.log(x) if x is not None and x > 0 else None
+
+def _configure_connection(dbapi_conn, read_only: bool) -> None:
+    cur = dbapi_conn.cursor()
+    try:
+        cur.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+        if not read_only:
+            cur.execute(f"PRAGMA journal_mode={DB_JOURNAL_MODE}")
+        cur.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+        cur.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        cur.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cur.execute("PRAGMA query_only=ON")
+        # ln() は SQLITE_ENABLE_MATH_FUNCTIONS 付きビルドにしか無いので、無ければPython実装を登録する
+        try:
+            cur.execute("SELECT ln(1)")
+        except sqlite3.OperationalError:
+            dbapi_conn.create_function("ln", 1, _ln, deterministic=True)
+    finally:
+        cur.close()
+
+def _make_engine(pool_size: int, read_only: bool):
+    eng = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": DB_BUSY_TIMEOUT_MS / 1000},
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_timeout=DB_POOL_TIMEOUT_SEC,
+        future=True,
+    )
+    event.listen(eng, "connect", lambda dbapi_conn, _record: _configure_connection(dbapi_conn, read_only))
+    return eng
+
+# 書き込みは少数の接続に絞って直列化し、読み取りは query_only の別プールに逃がす
+engine = _make_engine(DB_WRITE_POOL_SIZE, read_only=False)
+read_engine = _make_engine(DB_READ_POOL_SIZE, read_only=True) if DB_READ_POOL_SIZE > 0 else engine
+
+class RoutingSession(Session):
+    """読み取りは read_engine、flush/DML は engine に振り分ける。
+    一度書き込み側を使ったトランザクションは、自分の未コミットの変更が見えるよう終了まで書き込み側に固定する。"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if read_engine is engine:
+            return engine
+        if self._flushing or self.info.get("writer") or getattr(clause, "is_dml", False):
+            self.info["writer"] = True
+            return engine
+        return read_engine
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _release_writer(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("writer", None)
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, future=True)
 Base = declarative_base()
 
+# async ルーター用(aiosqlite)。同じプロファイルを適用し、接続待ちでワーカースレッドを塞がない
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args={"timeout": DB_BUSY_TIMEOUT_MS / 1000},
+    pool_size=DB_ASYNC_POOL_SIZE,
+    max_overflow=0,
+    pool_timeout=DB_POOL_TIMEOUT_SEC,
+)
+event.listen(async_engine.sync_engine, "connect", lambda dbapi_conn, _record: _configure_connection(dbapi_conn, read_only=False))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def ensure_indexes(bind) -> None:
+    """create_all は既存のテーブルにインデックスを足さないので、モデルで宣言したインデックスを無ければ作る。"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+def release(db: Session, *objs) -> None:
+    """objs をセッションから切り離してトランザクションを終え、接続をプールに返す。
+    LLM など遅い外部呼び出しの前に使う(切り離したオブジェクトは読み込み済みの属性だけ使える)。"""
+    for obj in objs:
+        db.expunge(obj)
+    db.commit()
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
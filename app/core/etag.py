@@ -0,0 +1,26 @@
+from __future__ import annotations
+import hashlib
+from fastapi import Request, Response
+
+# 毎回再検証させる(ブラウザは ETag 付きで保存し、次回 If-None-Match を送る)
+CACHE_CONTROL = "no-cache"
+
+def make_etag(*parts) -> str:
+    raw = "\x1f".join(str(p) for p in parts)
+    return '"' + hashlib.blake2b(raw.encode("utf-8"), digest_size=12).hexdigest() + '"'
+
+def if_none_match(request: Request, etag: str) -> bool:
+    """If-None-Match が etag に一致するか(弱い比較。W/ の有無は無視)。"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(t.strip().removeprefix("W/") == etag for t in header.split(","))
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
@@ -0,0 +1,82 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", "storage/llm_cache.db"))
+LLM_CACHE_TTL_SEC = int(os.getenv("LLM_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+_conn: sqlite3.Connection | None = None
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        LLM_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _conn = sqlite3.connect(LLM_CACHE_PATH.as_posix(), check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)")
+    return _conn
+
+def cache_key(provider: str, model: str, system: str, user: str, max_tokens: int) -> str:
+    blob = json.dumps([provider, model, system, user, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def get(key: str) -> str | None:
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        row = conn.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            _stats["misses"] += 1
+            return None
+        if now - row[1] > LLM_CACHE_TTL_SEC:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            _stats["misses"] += 1; _stats["expired"] += 1
+            return None
+        conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        _stats["hits"] += 1
+        return row[0]
+
+def put(key: str, response: str) -> None:
+    now = time.time()
+    with _lock:
+        conn = _connect()
+        conn.execute(
+            "INSERT INTO llm_cache (key, response, created_at, accessed_at) VALUES (?, ?, ?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET response = excluded.response,"
+            " created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+            (key, response, now, now),
+        )
+        over = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - LLM_CACHE_MAX_ENTRIES
+        if over > 0:
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (over,),
+            )
+            _stats["evictions"] += over
+
+def clear() -> None:
+    with _lock:
+        _connect().execute("DELETE FROM llm_cache")
+
+def stats() -> Dict[str, Any]:
+    with _lock:
+        out = dict(_stats)
+    total = out["hits"] + out["misses"]
+    out["hit_rate"] = round(out["hits"] / total, 3) if total else 0.0
+    return out
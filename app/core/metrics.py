@@ -0,0 +1,167 @@
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Tuple
+from app.core import llm_cache
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_SLOW_MS = float(os.getenv("METRICS_SLOW_MS", "0"))  # 0 なら遅いリクエストのログを出さない
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+log = logging.getLogger("app.metrics")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """Prometheus 形式のヒストグラム(ラベルごとの累積バケット・合計・件数)。"""
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = BUCKETS):
+        self.name, self.help, self.buckets = name, help, buckets
+        self._series: Dict[Labels, List[float]] = {}  # [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            s[i] += 1; s[-1] += seconds
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for key, s in sorted(series.items()):
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in key)
+            sep = "," if base else ""
+            cum = 0.0
+            for le, n in zip(self.buckets + (float("inf"),), s[:-1]):
+                cum += n
+                out.append(f'{self.name}_bucket{{{base}{sep}le="{"+Inf" if le == float("inf") else le}"}} {cum:g}')
+            out.append(f"{self.name}_sum{{{base}}} {s[-1]:.6f}")
+            out.append(f"{self.name}_count{{{base}}} {cum:g}")
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+http_latency = Histogram("http_request_duration_seconds", "HTTP request latency by route template")
+db_latency = Histogram("db_query_duration_seconds", "SQL statement execution time by route")
+llm_latency = Histogram("llm_call_duration_seconds", "LLM provider call time")
+ics_latency = Histogram("ics_duration_seconds", "ICS feed fetch and parse time")
+REGISTRY = (http_latency, db_latency, llm_latency, ics_latency)
+
+# リクエスト単位の内訳 {stage: [回数, 秒]}。スレッドプールへは contextvars ごと渡す(dict は共有される)
+_stages: ContextVar[Dict[str, List[float]] | None] = ContextVar("metrics_stages", default=None)
+_scope: ContextVar[dict | None] = ContextVar("metrics_scope", default=None)
+
+def _add_stage(stage: str, seconds: float) -> None:
+    stages = _stages.get()
+    if stages is not None:
+        s = stages.setdefault(stage, [0, 0.0])
+        s[0] += 1; s[1] += seconds
+
+@contextmanager
+def timed(hist: Histogram, stage: str, **labels: str) -> Iterator[Dict[str, str]]:
+    """hist に記録し、リクエスト中なら stage の内訳にも加える。yield した dict でラベル(outcome 等)を足せる。"""
+    extra: Dict[str, str] = {}
+    t = time.perf_counter()
+    try:
+        yield extra
+        extra.setdefault("outcome", "ok")
+    except BaseException:
+        extra.setdefault("outcome", "error")
+        raise
+    finally:
+        dt = time.perf_counter() - t
+        if METRICS_ENABLED:
+            hist.observe(dt, **labels, **extra)
+            _add_stage(stage, dt)
+
+LLM_CACHE_COUNTERS = (
+    ("hits", "LLM response cache hits"),
+    ("misses", "LLM response cache misses (including expired entries)"),
+    ("expired", "LLM response cache entries dropped on read after the TTL"),
+    ("evictions", "LLM response cache entries evicted over LLM_CACHE_MAX_ENTRIES"),
+)
+
+def _counters() -> List[str]:
+    """他のモジュールが数えている累積値(プロセス起動から)を counter として出す。"""
+    stats = llm_cache.stats()
+    out: List[str] = []
+    for key, help in LLM_CACHE_COUNTERS:
+        name = f"llm_cache_{key}_total"
+        out += [f"# HELP {name} {help}", f"# TYPE {name} counter", f"{name} {stats[key]}"]
+    return out
+
+def render() -> str:
+    return "\n".join([line for h in REGISTRY for line in h.render()] + _counters()) + "\n"
+
+def reset() -> None:
+    for h in REGISTRY:
+        h.clear()
+
+def instrument_engine(engine) -> None:
+    """SQLAlchemy の cursor execute イベントで SQL ごとの時間を数える(async エンジンは sync_engine を渡す)。"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("metrics_t0")
+        if not stack:
+            return
+        dt = time.perf_counter() - stack.pop()
+        scope = _scope.get()
+        db_latency.observe(dt, route=_route_template(scope) if scope is not None else "-")
+        _add_stage("db", dt)
+
+class MetricsMiddleware:
+    """ASGI ミドルウェア。ルートのテンプレート(/v1/goals/{goal_id} など)ごとにレイテンシを記録する。"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+        stages: Dict[str, List[float]] = {}
+        t_stages, t_scope = _stages.set(stages), _scope.set(scope)
+        status = {"code": 500}
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        t = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            dt = time.perf_counter() - t
+            route = _route_template(scope)
+            http_latency.observe(dt, method=scope["method"], route=route, status=str(status["code"]))
+            if METRICS_SLOW_MS and dt * 1000 >= METRICS_SLOW_MS:
+                detail = " ".join(f"{k}={v[1] * 1000:.1f}ms/{v[0]:g}" for k, v in sorted(stages.items()))
+                log.warning("slow request %s %s %d %.1fms %s", scope["method"], route, status["code"], dt * 1000, detail)
+            _stages.reset(t_stages); _scope.reset(t_scope)
+
+def _route_template(scope) -> str:
+    """ルーティングで scope に入ったルートのテンプレート。Mount(静的ファイル)はマウント先、未一致は unmatched。"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or ("endpoint" in scope and scope.get("root_path")) or "unmatched"
@@ -1,8 +1,11 @@
 from __future__ import annotations
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.staticfiles import StaticFiles
-from app.core.db import engine, Base
+from app.core.db import engine, read_engine, async_engine
+from app.core import metrics
 from app.routers.goals import router as v1_goals_router
 from app.routers.plan import router as v1_plan_router
 from app.routers.pages import router as page_router
@@ -10,23 +13,34 @@ from app.routers.reflect import router as v1_reflect_router
 from app.routers.reflect_ai import router as v1_reflect_ai_router
 from app.routers.review import router as v1_review_router
 from app.routers.integration import router as v1_integration_router
-from app.services.scheduler import start_scheduler
-import os
+from app.services.bootstrap import init_db
 
-app = FastAPI(title="Personal PM Coach (MVP)")
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # DB の初期化は import 時ではなく起動時に1回だけ行う(import は副作用なし)
+    init_db(engine)
+    yield
+
+app = FastAPI(title="Personal PM Coach (MVP)", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True,
     allow_methods=["*"], allow_headers=["*"],
 )
-
-Base.metadata.create_all(bind=engine)
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    for eng in {engine, read_engine, async_engine.sync_engine}:
+        metrics.instrument_engine(eng)
 
 @app.get("/healthz")
 def healthz():
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # Routers
 app.include_router(v1_goals_router)
 app.include_router(v1_plan_router)
@@ -38,7 +52,3 @@ app.include_router(page_router)
 
 # Static
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
-
-# Scheduler
-if os.getenv("DISABLE_SCHEDULER", "false").lower() != "true":
-    start_scheduler()
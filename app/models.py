@@ -1,6 +1,6 @@
 from __future__ import annotations
 from datetime import date, datetime
-from sqlalchemy import Integer, String, Text, Date, DateTime, ForeignKey
+from sqlalchemy import Integer, String, Text, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.core.db import Base
 
@@ -27,6 +27,7 @@ class Goal(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (Index("ix_tasks_goal_status", "goal_id", "status"),)
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     goal_id: Mapped[int] = mapped_column(ForeignKey("goals.id", ondelete="CASCADE"), index=True)
     title: Mapped[str] = mapped_column(String(200))
@@ -39,6 +40,7 @@ class Task(Base):
 
 class Reflection(Base):
     __tablename__ = "reflections"
+    __table_args__ = (Index("ix_reflections_user_date", "user_id", "date"),)
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
     date: Mapped[date] = mapped_column(Date)
@@ -47,8 +49,29 @@ class Reflection(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     user: Mapped["User"] = relationship(back_populates="reflections")
 
+class ReflectionDaily(Base):
+    """振り返りの日別集計(件数・気分の合計・その日の最新ID)。振り返りの保存時に同じトランザクションで更新する。"""
+    __tablename__ = "reflection_daily"
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date: Mapped[date] = mapped_column(Date, primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, default=0)
+    mood_sum: Mapped[int] = mapped_column(Integer, default=0)
+    latest_id: Mapped[int] = mapped_column(Integer)
+
+class ReflectionDigest(Base):
+    """日別の振り返りダイジェスト。count/latest_id が日別集計と一致する間は作り直さない。"""
+    __tablename__ = "reflection_digests"
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date: Mapped[date] = mapped_column(Date, primary_key=True)
+    count: Mapped[int] = mapped_column(Integer)
+    latest_id: Mapped[int] = mapped_column(Integer)
+    kind: Mapped[str] = mapped_column(String(100))  # 生成元("extract" または "provider:model")
+    digest: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
 class Suggestion(Base):
     __tablename__ = "suggestions"
+    __table_args__ = (Index("ix_suggestions_user_type_date", "user_id", "type", "date"),)
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
     date: Mapped[date] = mapped_column(Date)
@@ -57,8 +80,22 @@ class Suggestion(Base):
 
 class Integration(Base):
     __tablename__ = "integrations"
+    __table_args__ = (Index("ix_integrations_user_kind_key", "user_id", "kind", "key"),)
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
     kind: Mapped[str] = mapped_column(String(50))
     key:  Mapped[str] = mapped_column(String(50), default="default")
     value: Mapped[str] = mapped_column(Text)
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    resource: Mapped[str] = mapped_column(String(30), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0)
+
+class Lease(Base):
+    """プロセス間のリース(リーダーロック)。expires_at を過ぎたら他のプロセスが取得できる。"""
+    __tablename__ = "leases"
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    owner: Mapped[str] = mapped_column(String(100))
+    expires_at: Mapped[datetime] = mapped_column(DateTime)
@@ -1,16 +1,25 @@
 from __future__ import annotations
+import json
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from app.core.db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, or_
+from app.core.db import get_db, get_async_db, SessionLocal, release
 from app import models as m
 from app.schemas import (
     GoalCreate, GoalUpdate, GoalOut,
     TaskCreate, TaskUpdate, TaskOut,
-    WbsPlanRequest, WbsPlanResult, WbsTask
+    WbsPlanRequest, WbsPlanResult, WbsTask,
+    TaskBatchRequest, TaskBatchResult,
 )
-from app.services.wbs import generate_wbs, save_wbs_as_tasks
+from app.core.etag import make_etag, if_none_match, not_modified, set_etag
+from app.services.versions import bump_version, get_version, GOALS
+from app.services.search import goals_fts, tasks_fts, match_query, match, bm25, contains_any, cursor_or_400, paginate
+from app.services.listing import GOAL_COLUMNS, GOAL_FIELDS, TASK_COLUMNS, TASK_FIELDS, rows_response
+from app.services.task_batch import apply_task_batch
+from app.services.wbs import generate_wbs, save_wbs_as_tasks, stream_wbs, save_wbs_task, _existing_titles
 
 router = APIRouter(prefix="/v1", tags=["v1"])
 
@@ -31,21 +40,50 @@ def create_goal(payload: GoalCreate, db: Session = Depends(get_db)):
         user_id=user.id, title=payload.title, why=payload.why,
         kgi=payload.kgi, deadline=payload.deadline, area=payload.area,
     )
-    db.add(goal); db.commit(); db.refresh(goal)
+    db.add(goal); bump_version(db, user.id, GOALS); db.commit(); db.refresh(goal)
     return goal
 
 @router.get("/goals", response_model=List[GoalOut])
-def list_goals(
-    db: Session = Depends(get_db),
+async def list_goals(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
     q: Optional[str] = Query(default=None),
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(default=None, description="前ページの X-Next-Cursor"),
 ):
-    user = get_or_create_demo_user(db)
-    stmt = select(m.Goal).where(m.Goal.user_id == user.id).order_by(m.Goal.id.desc())
-    if q:
-        stmt = stmt.where(m.Goal.title.contains(q))
-    return db.execute(stmt.limit(limit).offset(offset)).scalars().all()
+    user = await db.run_sync(get_or_create_demo_user)
+    # 目標・タスクの書き込みで上がるバージョンとクエリ文字列から ETag を作り、変化が無ければ 304
+    etag = make_etag(user.id, GOALS, await db.run_sync(lambda s: get_version(s, user.id, GOALS)), request.url.query)
+    if if_none_match(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    fts_q = match_query(q)
+    if fts_q:
+        # 全文検索: bm25 の昇順(よく一致する順)、同点は新しい順
+        rank = bm25("goals_fts")
+        stmt = (select(*GOAL_COLUMNS, rank).join(goals_fts, goals_fts.c.rowid == m.Goal.id)
+                .where(m.Goal.user_id == user.id).where(match("goals_fts", fts_q)))
+        if cursor:
+            r, last_id = cursor_or_400(cursor, 2)
+            stmt = stmt.where(or_(rank > r, and_(rank == r, m.Goal.id < last_id)))
+        stmt = stmt.order_by(rank, m.Goal.id.desc())
+        key = lambda row: (row[-1], row.id)
+    else:
+        stmt = select(*GOAL_COLUMNS).where(m.Goal.user_id == user.id)
+        if q:
+            stmt = stmt.where(contains_any(q, m.Goal.title, m.Goal.why, m.Goal.kgi))  # goals_fts と同じ列
+        if cursor:
+            (last_id,) = cursor_or_400(cursor, 1)
+            stmt = stmt.where(m.Goal.id < last_id)
+        stmt = stmt.order_by(m.Goal.id.desc())
+        key = lambda row: (row.id,)
+    if not cursor and offset:
+        stmt = stmt.offset(offset)
+    rows = paginate(list((await db.execute(stmt.limit(limit + 1))).all()), limit, response, key)
+    # ヘッダ(ETag / X-Next-Cursor)は Response を直接返すと引き継がれないので明示的に渡す
+    return rows_response((row[:-1] for row in rows) if fts_q else rows, GOAL_FIELDS, response.headers)
 
 @router.get("/goals/{goal_id}", response_model=GoalOut)
 def get_goal(goal_id: int, db: Session = Depends(get_db)):
@@ -62,7 +100,7 @@ def update_goal(goal_id: int, payload: GoalUpdate, db: Session = Depends(get_db)
     data = payload.dict(exclude_unset=True)
     for k, v in data.items():
         setattr(goal, k, v)
-    db.add(goal); db.commit(); db.refresh(goal)
+    db.add(goal); bump_version(db, goal.user_id, GOALS); db.commit(); db.refresh(goal)
     return goal
 
 @router.delete("/goals/{goal_id}", status_code=204)
@@ -70,7 +108,7 @@ def delete_goal(goal_id: int, db: Session = Depends(get_db)):
     goal = db.get(m.Goal, goal_id)
     if not goal:
         raise HTTPException(status_code=404, detail="goal not found")
-    db.delete(goal); db.commit()
+    db.delete(goal); bump_version(db, goal.user_id, GOALS); db.commit()
     return None
 
 # Tasks
@@ -84,18 +122,48 @@ def create_task(goal_id: int, payload: TaskCreate, db: Session = Depends(get_db)
         impact=payload.impact, effort_min=payload.effort_min, due=payload.due,
         parent_task_id=payload.parent_task_id,
     )
-    db.add(task); db.commit(); db.refresh(task)
+    db.add(task); bump_version(db, goal.user_id, GOALS); db.commit(); db.refresh(task)
     return task
 
 @router.get("/goals/{goal_id}/tasks", response_model=List[TaskOut])
-def list_tasks(goal_id: int, db: Session = Depends(get_db), status: Optional[str] = Query(default=None, pattern="^(pending|doing|done)$")):
+def list_tasks(
+    goal_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    status: Optional[str] = Query(default=None, pattern="^(pending|doing|done)$"),
+    q: Optional[str] = Query(default=None),
+    limit: Optional[int] = Query(default=None, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None, description="前ページの X-Next-Cursor"),
+):
     goal = db.get(m.Goal, goal_id)
     if not goal:
         raise HTTPException(status_code=404, detail="goal not found")
-    stmt = select(m.Task).where(m.Task.goal_id == goal_id)
+    fts_q = match_query(q)
+    if fts_q:
+        # 全文検索: list_goals と同じく bm25 の昇順、同点は新しい順。カーソルは (rank, id)
+        rank = bm25("tasks_fts")
+        stmt = (select(*TASK_COLUMNS, rank).join(tasks_fts, tasks_fts.c.rowid == m.Task.id)
+                .where(m.Task.goal_id == goal_id).where(match("tasks_fts", fts_q)))
+        if cursor:
+            r, last_id = cursor_or_400(cursor, 2)
+            stmt = stmt.where(or_(rank > r, and_(rank == r, m.Task.id < last_id)))
+        stmt = stmt.order_by(rank, m.Task.id.desc())
+        key = lambda row: (row[-1], row.id)
+    else:
+        stmt = select(*TASK_COLUMNS).where(m.Task.goal_id == goal_id)
+        if q:
+            stmt = stmt.where(contains_any(q, m.Task.title))
+        if cursor:
+            (last_id,) = cursor_or_400(cursor, 1)
+            stmt = stmt.where(m.Task.id < last_id)
+        stmt = stmt.order_by(m.Task.id.desc())
+        key = lambda row: (row.id,)
     if status:
         stmt = stmt.where(m.Task.status == status)
-    return db.execute(stmt.order_by(m.Task.id.desc())).scalars().all()
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+    rows = paginate(list(db.execute(stmt).all()), limit, response, key)
+    return rows_response((row[:-1] for row in rows) if fts_q else rows, TASK_FIELDS, response.headers)
 
 @router.get("/tasks/{task_id}", response_model=TaskOut)
 def get_task(task_id: int, db: Session = Depends(get_db)):
@@ -112,7 +180,7 @@ def update_task(task_id: int, payload: TaskUpdate, db: Session = Depends(get_db)
     data = payload.dict(exclude_unset=True)
     for k, v in data.items():
         setattr(task, k, v)
-    db.add(task); db.commit(); db.refresh(task)
+    db.add(task); bump_version(db, task.goal.user_id, GOALS); db.commit(); db.refresh(task)
     return task
 
 @router.delete("/tasks/{task_id}", status_code=204)
@@ -120,15 +188,25 @@ def delete_task(task_id: int, db: Session = Depends(get_db)):
     task = db.get(m.Task, task_id)
     if not task:
         raise HTTPException(status_code=404, detail="task not found")
-    db.delete(task); db.commit()
+    db.delete(task); bump_version(db, task.goal.user_id, GOALS); db.commit()
     return None
 
+@router.post("/tasks:batch", response_model=TaskBatchResult)
+def batch_tasks(payload: TaskBatchRequest, response: Response, db: Session = Depends(get_db)):
+    """タスクの作成/更新/削除をまとめて1トランザクションで適用する。不正な項目があれば全体を取り消して 422。"""
+    user = get_or_create_demo_user(db)
+    result = apply_task_batch(db, user, payload.ops)
+    if not result.committed:
+        response.status_code = 422
+    return result
+
 # WBS: generate plan
 @router.post("/goals/{goal_id}/plan", response_model=WbsPlanResult)
 def generate_goal_plan(goal_id: int, payload: WbsPlanRequest, db: Session = Depends(get_db)):
     goal = db.get(m.Goal, goal_id)
     if not goal:
         raise HTTPException(status_code=404, detail="goal not found")
+    release(db, goal)  # LLM の応答を待つ間は接続を返す
     items: List[WbsTask] = generate_wbs(db, goal, payload)
     created = 0
     saved = False
@@ -136,3 +214,32 @@ def generate_goal_plan(goal_id: int, payload: WbsPlanRequest, db: Session = Depe
         created = save_wbs_as_tasks(db, goal, items)
         saved = True
     return WbsPlanResult(goal_id=goal.id, created_count=created, items=items, saved=saved)
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/goals/{goal_id}/plan/stream")
+def stream_goal_plan(goal_id: int, payload: WbsPlanRequest, db: Session = Depends(get_db)):
+    """WBSをServer-Sent Eventsで返す。完成したタスクごとに `task` イベント、最後に `done` イベントを送る。"""
+    if not db.get(m.Goal, goal_id):
+        raise HTTPException(status_code=404, detail="goal not found")
+
+    def events():
+        # レスポンス送信中も使うため、リクエストのセッションとは別に開く
+        sdb = SessionLocal()
+        try:
+            goal = sdb.get(m.Goal, goal_id)
+            existing = _existing_titles(sdb, goal)
+            release(sdb, goal)  # トークンを待つ間(dry_run では最後まで)読み取りトランザクションと接続を握らない
+            created = 0
+            for it in stream_wbs(goal, payload):
+                saved = False
+                if not payload.dry_run:
+                    saved = save_wbs_task(sdb, goal, it, existing)
+                    created += int(saved)
+                yield _sse("task", {**it.model_dump(mode="json"), "saved": saved})
+            yield _sse("done", {"goal_id": goal_id, "created_count": created, "saved": not payload.dry_run})
+        finally:
+            sdb.close()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
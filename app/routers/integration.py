@@ -1,11 +1,13 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from app.core.db import get_db
 from app import models as m
 from app.schemas import IntegrationSet, IntegrationOut
+from app.core.etag import make_etag, if_none_match, not_modified, set_etag
 from app.services.plan import get_or_create_demo_user
+from app.services.versions import bump_version, get_version, INTEGRATION
 
 router = APIRouter(prefix="/v1", tags=["v1"])
 
@@ -16,14 +18,18 @@ def set_integration(payload: IntegrationSet, db: Session = Depends(get_db)):
     row = db.execute(stmt).scalars().first()
     if row:
         row.value = payload.value
-        db.add(row); db.commit(); db.refresh(row)
+        db.add(row); bump_version(db, user.id, INTEGRATION); db.commit(); db.refresh(row)
         return row
     row = m.Integration(user_id=user.id, kind=payload.kind, key="default", value=payload.value)
-    db.add(row); db.commit(); db.refresh(row)
+    db.add(row); bump_version(db, user.id, INTEGRATION); db.commit(); db.refresh(row)
     return row
 
 @router.get("/integration", response_model=IntegrationOut | None)
-def get_integration(db: Session = Depends(get_db)):
+def get_integration(request: Request, response: Response, db: Session = Depends(get_db)):
     user = get_or_create_demo_user(db)
+    etag = make_etag(user.id, INTEGRATION, get_version(db, user.id, INTEGRATION))
+    if if_none_match(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     stmt = select(m.Integration).where(m.Integration.user_id == user.id, m.Integration.kind == "gcal_ics", m.Integration.key == "default")
     return db.execute(stmt).scalars().first()
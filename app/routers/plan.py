@@ -1,33 +1,59 @@
 from __future__ import annotations
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.core.db import get_db
+from app.core.db import get_db, get_async_db
+from app.core.ai import LLM_DEADLINE_SEC
 from app.schemas import PlanItem
-from app.services.plan import pick_today_tasks, _coach_line, get_or_create_demo_user
-from app.services.calendar import free_minutes_between
+from app.services.plan import pick_today_tasks, _acoach_lines, get_or_create_demo_user
+from app.services.calendar import free_minutes_between, free_blocks_range
+from app.services import plan_cache
+from app.services.versions import get_version, GOALS
 from app import models as m
 
 router = APIRouter(prefix="/v1", tags=["v1"])
 
+MAX_RANGE_DAYS = 92
+HHMM = r"^([01]\d|2[0-3]):[0-5]\d$"
+
+def _ics_url(db: Session, user: m.User) -> str:
+    row = db.execute(
+        select(m.Integration).where(
+            m.Integration.user_id == user.id,
+            m.Integration.kind == "gcal_ics",
+            m.Integration.key == "default",
+        )
+    ).scalars().first()
+    if not row:
+        raise HTTPException(status_code=404, detail="ICS not configured")
+    return row.value
+
 @router.get("/plan/today", response_model=List[PlanItem])
-def plan_today(
+async def plan_today(
     minutes_available: int = Query(90, ge=15, le=600),
     now_iso: Optional[str] = Query(default=None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     now = datetime.fromisoformat(now_iso) if now_iso else datetime.now()
-    user = get_or_create_demo_user(db)
-    picked = pick_today_tasks(db, user, minutes_available=minutes_available, today=now.date())
+    user = await db.run_sync(get_or_create_demo_user)
+    version = await db.run_sync(get_version, user.id, GOALS)
+    cached = plan_cache.get_plan(user.id, now.date(), minutes_available, version)
+    if cached is not None:
+        return cached
+    picked = await db.run_sync(pick_today_tasks, user, minutes_available=minutes_available, today=now.date())
+    await db.commit()  # LLM の応答を待つ間は接続を返す(expire_on_commit=False なので picked はそのまま使える)
+    lines = await _acoach_lines([t for t, _ in picked], deadline_sec=LLM_DEADLINE_SEC)
     items: List[PlanItem] = []
-    for t, score in picked:
+    for (t, score), line in zip(picked, lines):
         items.append(PlanItem(
             task_id=t.id, goal_id=t.goal_id, title=t.title, status=t.status,
             impact=t.impact, effort_min=t.effort_min, due=t.due,
-            score=round(score, 3), coach_line=_coach_line(t.title, t.effort_min or 30),
+            score=round(score, 3), coach_line=line,
         ))
+    plan_cache.put_plan(user.id, now.date(), minutes_available, version, items)
     return items
 
 @router.get("/plan/available_minutes")
@@ -38,17 +64,30 @@ def plan_available_minutes(
     db: Session = Depends(get_db),
 ):
     user = get_or_create_demo_user(db)
-    row = db.execute(
-        select(m.Integration).where(
-            m.Integration.user_id == user.id,
-            m.Integration.kind == "gcal_ics",
-            m.Integration.key == "default",
-        )
-    ).scalars().first()
-    if not row:
-        raise HTTPException(status_code=404, detail="ICS not configured")
+    ics_url = _ics_url(db, user)
     target = datetime.now().date()
     if date_str:
         target = datetime.fromisoformat(date_str).date()
-    minutes = free_minutes_between(row.value, target, work_start, work_end)
+    minutes = free_minutes_between(ics_url, target, work_start, work_end)
     return {"date": str(target), "work_start": work_start, "work_end": work_end, "available_minutes": minutes}
+
+@router.get("/plan/available_minutes/range")
+def plan_available_minutes_range(
+    start: date = Query(description="YYYY-MM-DD"),
+    end: date | None = Query(default=None, description="YYYY-MM-DD (省略時は start から7日間)"),
+    work_start: str = Query(default="07:00", pattern=HHMM),
+    work_end: str = Query(default="23:00", pattern=HHMM),
+    db: Session = Depends(get_db),
+):
+    user = get_or_create_demo_user(db)
+    end = end or start + timedelta(days=6)
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must be on or after start")
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"range must be {MAX_RANGE_DAYS} days or less")
+    ics_url = _ics_url(db, user)
+    days = free_blocks_range(ics_url, start, end, work_start, work_end)
+    return {
+        "start": str(start), "end": str(end), "work_start": work_start, "work_end": work_end,
+        "total_minutes": sum(d["available_minutes"] for d in days), "days": days,
+    }
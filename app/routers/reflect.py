@@ -1,12 +1,18 @@
 from __future__ import annotations
-from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, Query
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-from app.core.db import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_, or_, func
+from app.core.db import get_db, get_async_db
 from app import models as m
-from app.schemas import ReflectionCreate, ReflectionOut, ReflectionSummary
+from app.schemas import ReflectionCreate, ReflectionOut, ReflectionSummary, ReflectionHit
+from app.core.etag import make_etag, if_none_match, not_modified, set_etag
 from app.services.plan import get_or_create_demo_user
+from app.services.versions import bump_version, get_version, REFLECTIONS
+from app.services.reflection_stats import record_reflection, window_stats
+from app.services.search import reflections_fts, match_query, match, bm25, snippet, plain_snippet, cursor_or_400, paginate
 
 router = APIRouter(prefix="/v1", tags=["v1"])
 
@@ -15,18 +21,61 @@ def create_reflection(payload: ReflectionCreate, db: Session = Depends(get_db)):
     user = get_or_create_demo_user(db)
     d = payload.date or datetime.now().date()
     ref = m.Reflection(user_id=user.id, date=d, text=payload.text or "", mood=payload.mood or 3)
-    db.add(ref); db.commit(); db.refresh(ref)
+    db.add(ref); db.flush(); record_reflection(db, ref); bump_version(db, user.id, REFLECTIONS); db.commit(); db.refresh(ref)
     return ref
 
 @router.get("/reflect/recent", response_model=ReflectionSummary)
-def recent_reflection_summary(days: int = Query(7, ge=1, le=30), db: Session = Depends(get_db)):
-    user = get_or_create_demo_user(db)
+async def recent_reflection_summary(request: Request, response: Response, days: int = Query(7, ge=1, le=365), db: AsyncSession = Depends(get_async_db)):
+    user = await db.run_sync(get_or_create_demo_user)
     today = datetime.now().date()
+    # 集計の窓は日付で変わるので today も ETag に含める
+    etag = make_etag(user.id, REFLECTIONS, await db.run_sync(lambda s: get_version(s, user.id, REFLECTIONS)), days, today)
+    if if_none_match(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     start = today - timedelta(days=days-1)
-    stmt = select(m.Reflection).where(m.Reflection.user_id == user.id).where(m.Reflection.date >= start).order_by(m.Reflection.date.desc(), m.Reflection.id.desc())
-    items = db.execute(stmt).scalars().all()
-    if not items:
+    stats = await db.run_sync(lambda s: window_stats(s, user.id, start))
+    if not stats.count:
         return ReflectionSummary(days=days, count=0, avg_mood=None, latest_text=None, latest_date=None)
-    avg_mood = sum(it.mood for it in items) / len(items)
-    latest = items[0]
-    return ReflectionSummary(days=days, count=len(items), avg_mood=round(avg_mood,2), latest_text=(latest.text[:240] if latest.text else None), latest_date=latest.date)
+    latest_text = (await db.execute(select(func.substr(m.Reflection.text, 1, 240)).where(m.Reflection.id == stats.latest_id))).scalar_one_or_none()
+    return ReflectionSummary(days=days, count=stats.count, avg_mood=stats.avg_mood, latest_text=latest_text or None, latest_date=stats.latest_date)
+
+@router.get("/reflect/search", response_model=List[ReflectionHit])
+def search_reflections(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    start: Optional[date] = Query(default=None),
+    end: Optional[date] = Query(default=None),
+    min_mood: int = Query(1, ge=1, le=5),
+    max_mood: int = Query(5, ge=1, le=5),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="前ページの X-Next-Cursor"),
+    db: Session = Depends(get_db),
+):
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must be <= end")
+    user = get_or_create_demo_user(db)
+    R = m.Reflection
+    filters = [R.user_id == user.id, R.mood >= min_mood, R.mood <= max_mood]
+    if start: filters.append(R.date >= start)
+    if end: filters.append(R.date <= end)
+    fts_q = match_query(q)
+    if fts_q:
+        # bm25 の昇順(よく一致する順)、同点は新しい順。抜粋は FTS5 の snippet() でハイライト
+        rank = bm25("reflections_fts")
+        stmt = (select(R.id, R.date, R.mood, snippet("reflections_fts").label("snippet"), rank.label("rank"))
+                .join(reflections_fts, reflections_fts.c.rowid == R.id).where(match("reflections_fts", fts_q), *filters))
+        if cursor:
+            r, last_id = cursor_or_400(cursor, 2)
+            stmt = stmt.where(or_(rank > r, and_(rank == r, R.id < last_id)))
+        rows = db.execute(stmt.order_by(rank, R.id.desc()).limit(limit + 1)).all()
+        rows = paginate(rows, limit, response, lambda row: (row.rank, row.id))
+        return [ReflectionHit(id=r.id, date=r.date, mood=r.mood, snippet=r.snippet, rank=r.rank) for r in rows]
+    # 3文字未満(trigram で引けない)は LIKE で新しい順
+    stmt = select(R.id, R.date, R.mood, R.text).where(R.text.contains(q.strip(), autoescape=True), *filters)
+    if cursor:
+        (last_id,) = cursor_or_400(cursor, 1)
+        stmt = stmt.where(R.id < last_id)
+    rows = db.execute(stmt.order_by(R.id.desc()).limit(limit + 1)).all()
+    rows = paginate(rows, limit, response, lambda row: (row.id,))
+    return [ReflectionHit(id=r.id, date=r.date, mood=r.mood, snippet=plain_snippet(r.text, q.strip())) for r in rows]
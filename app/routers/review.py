@@ -1,20 +1,27 @@
 from __future__ import annotations
 import json
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.core.db import get_db
+from app.core.db import get_db, get_async_db
 from app import models as m
+from app.core.etag import make_etag, if_none_match, not_modified, set_etag
 from app.services.plan import get_or_create_demo_user
+from app.services.versions import get_version, REVIEW
 from app.services.weekly_review import upsert_this_week
 
 router = APIRouter(prefix="/v1", tags=["v1"])
 
 @router.get("/review/weekly")
-def get_latest_weekly_review(db: Session = Depends(get_db)):
-    user = get_or_create_demo_user(db)
+async def get_latest_weekly_review(request: Request, response: Response, db: AsyncSession = Depends(get_async_db)):
+    user = await db.run_sync(get_or_create_demo_user)
+    etag = make_etag(user.id, REVIEW, await db.run_sync(lambda s: get_version(s, user.id, REVIEW)))
+    if if_none_match(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
     stmt = select(m.Suggestion).where(m.Suggestion.user_id == user.id).where(m.Suggestion.type == "weekly").order_by(m.Suggestion.id.desc())
-    sug = db.execute(stmt).scalars().first()
+    sug = (await db.execute(stmt)).scalars().first()
     if not sug:
         return {"exists": False, "summary": None, "improvements": [], "date": None}
     data = json.loads(sug.content_json or "{}")
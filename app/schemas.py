@@ -1,6 +1,6 @@
 from __future__ import annotations
 from datetime import date, datetime
-from typing import Optional, List
+from typing import Annotated, Literal, Optional, List, Union
 from pydantic import BaseModel, Field
 
 class ORMModel(BaseModel):
@@ -58,6 +58,38 @@ class TaskOut(ORMModel):
     due: Optional[date] | None
     parent_task_id: Optional[int] | None
 
+# Task batch (POST /v1/tasks:batch)
+class TaskBatchCreate(TaskCreate):
+    op: Literal["create"]
+    goal_id: int
+
+class TaskBatchUpdate(TaskUpdate):
+    op: Literal["update"]
+    id: int
+
+class TaskBatchDelete(BaseModel):
+    op: Literal["delete"]
+    id: int
+
+TaskBatchOp = Annotated[Union[TaskBatchCreate, TaskBatchUpdate, TaskBatchDelete], Field(discriminator="op")]
+
+class TaskBatchRequest(BaseModel):
+    ops: List[TaskBatchOp] = Field(min_length=1, max_length=1000)
+
+class TaskBatchItemResult(BaseModel):
+    index: int
+    op: str
+    ok: bool
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class TaskBatchResult(BaseModel):
+    committed: bool
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    results: List[TaskBatchItemResult]
+
 # Plan item (today)
 class PlanItem(BaseModel):
     task_id: int
@@ -91,6 +123,13 @@ class ReflectionSummary(BaseModel):
     latest_text: str | None
     latest_date: Optional[date] = None
 
+class ReflectionHit(BaseModel):
+    id: int
+    date: date
+    mood: int
+    snippet: str
+    rank: float | None = None
+
 # WBS
 class WbsTask(BaseModel):
     title: str = Field(min_length=1, max_length=200)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+from datetime import date, datetime
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from app import models as m
+from app.services.plan import W_DEADLINE, W_IMPACT, W_EFFORT
+
+DEFAULT_BUDGETS: Tuple[int, ...] = (30, 60, 90, 120)
+
+# user_id -> minutes_available -> [(task_id, score)]
+BatchPlan = Dict[int, Dict[int, List[Tuple[int, float]]]]
+
+def _proximity_vec(days_left: np.ndarray, has_due: np.ndarray) -> np.ndarray:
+    prox = np.select(
+        [days_left < 0, days_left == 0, days_left <= 3, days_left <= 7, days_left <= 14],
+        [2.0, 1.8, 1.5, 1.0, 0.6],
+        default=0.3,
+    )
+    return np.where(has_due, prox, 0.0)
+
+def _score_vec(impact: np.ndarray, effort: np.ndarray, days_left: np.ndarray, has_due: np.ndarray) -> np.ndarray:
+    return W_DEADLINE * _proximity_vec(days_left, has_due) + W_IMPACT * np.maximum(1, impact) - W_EFFORT * np.log(1 + np.maximum(1, effort))
+
+def _load_columns(db: Session, today: date, user_ids: Sequence[int] | None) -> Dict[str, np.ndarray]:
+    stmt = (select(
+                m.Goal.user_id, m.Task.id,
+                func.coalesce(func.nullif(m.Task.impact, 0), 1),
+                func.coalesce(func.nullif(m.Task.effort_min, 0), 30),
+                m.Task.due.is_not(None),
+                func.coalesce(func.julianday(m.Task.due) - func.julianday(today.isoformat()), 0),
+            )
+            .join(m.Goal, m.Task.goal_id == m.Goal.id)
+            .where(m.Task.status != "done"))
+    if user_ids is not None:
+        stmt = stmt.where(m.Goal.user_id.in_(list(user_ids)))
+    rows = db.execute(stmt).all()
+    cols = list(zip(*rows)) if rows else [()] * 6
+    return {
+        "user_id": np.fromiter(cols[0], dtype=np.int64, count=len(rows)),
+        "task_id": np.fromiter(cols[1], dtype=np.int64, count=len(rows)),
+        "impact": np.fromiter(cols[2], dtype=np.float64, count=len(rows)),
+        "effort": np.fromiter(cols[3], dtype=np.float64, count=len(rows)),
+        "has_due": np.fromiter(cols[4], dtype=bool, count=len(rows)),
+        "days_left": np.fromiter(cols[5], dtype=np.float64, count=len(rows)),
+    }
+
+def _select_for_budgets(effort: np.ndarray, budgets: np.ndarray, k: int) -> List[List[int]]:
+    """スコア降順に並んだタスク列に対し、pick_today_tasks と同じ貪欲選択を全予算ぶん同時に進める。"""
+    remain = np.maximum(1, budgets).astype(np.float64)
+    count = np.zeros(len(budgets), dtype=np.int64)
+    picks: List[List[int]] = [[] for _ in range(len(budgets))]
+    for i, e in enumerate(effort):
+        active = (count < k) & (remain > 0)
+        if not active.any():
+            break
+        take = active & ((e <= remain) | (count == 0))
+        if take.any():
+            remain -= e * take; count += take
+            for b in np.flatnonzero(take):
+                picks[b].append(i)
+    return picks
+
+def plan_for_users(db: Session, user_ids: Sequence[int] | None = None, budgets: Sequence[int] = DEFAULT_BUDGETS,
+                   today: date | None = None, k: int = 3) -> BatchPlan:
+    """全ユーザー(または user_ids)の今日の計画を、予算ごとにまとめて計算する。
+    タスクは1回のクエリで列として読み、スコアはベクトル演算で求める。結果は pick_today_tasks と同じ選び方になる。"""
+    if today is None:
+        today = datetime.now().date()
+    if user_ids is None:
+        user_ids = db.execute(select(m.User.id)).scalars().all()
+    budgets_arr = np.asarray(list(budgets), dtype=np.int64)
+    out: BatchPlan = {int(u): {int(b): [] for b in budgets_arr} for u in user_ids}
+    cols = _load_columns(db, today, user_ids)
+    if len(cols["task_id"]) == 0:
+        return out
+    score = _score_vec(cols["impact"], cols["effort"], cols["days_left"], cols["has_due"])
+    order = np.lexsort((cols["task_id"], -score, cols["user_id"]))
+    uid = cols["user_id"][order]; tid = cols["task_id"][order]
+    eff = cols["effort"][order]; score = score[order]
+    bounds = np.flatnonzero(np.diff(uid)) + 1
+    for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(uid)]):
+        picks = _select_for_budgets(eff[start:end], budgets_arr, k)
+        per_user = out.setdefault(int(uid[start]), {})
+        for b, idxs in zip(budgets_arr, picks):
+            per_user[int(b)] = [(int(tid[start + i]), float(score[start + i])) for i in idxs]
+    return out
@@ -0,0 +1,13 @@
+from __future__ import annotations
+from sqlalchemy.engine import Engine
+from app.core.db import Base, engine, ensure_indexes
+from app import models  # noqa: F401  (テーブル定義の登録)
+from app.services.search import ensure_search_index
+from app.services.reflection_stats import ensure_reflection_daily
+
+def init_db(bind: Engine = engine) -> None:
+    """起動時のDB初期化。Web(lifespan)とワーカーのどちらが先に起動しても同じ状態になるよう、両方から呼ぶ。"""
+    Base.metadata.create_all(bind=bind)
+    ensure_indexes(bind)
+    ensure_search_index(bind)
+    ensure_reflection_daily(bind)
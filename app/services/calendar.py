@@ -1,31 +1,53 @@
 from __future__ import annotations
-import requests
-from datetime import datetime, date, time
-from typing import List, Tuple
-from ics import Calendar
+import logging
+import os
+import threading
+import time as _time
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from weakref import WeakValueDictionary
+from datetime import datetime, date, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
 from dateutil.tz import gettz
+from app.core.metrics import timed, ics_latency
 
 JST = gettz("Asia/Tokyo")
 
+log = logging.getLogger(__name__)
+
+ICS_CACHE_TTL_SEC = int(os.getenv("ICS_CACHE_TTL_SEC", "300"))
+ICS_CACHE_MAX_FEEDS = int(os.getenv("ICS_CACHE_MAX_FEEDS", "64"))
+
+Span = Tuple[datetime, datetime]
+
+@dataclass
+class _Feed:
+    events: List[Span]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    checked_at: float
+
+_feeds: "OrderedDict[str, _Feed]" = OrderedDict()
+_feeds_lock = threading.Lock()
+
+class _FetchLock:
+    """URLごとの取得ロック(同じフィードの取得・パースは同時に1回だけ)。Lock は弱参照できないので包む。"""
+    __slots__ = ("lock", "__weakref__")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+
+# フィードの LRU とは別に持つ。待っている・取得中のスレッドが参照している間は消えないので、同じURLに2つ目のロックは作られない
+_fetch_locks: "WeakValueDictionary[str, _FetchLock]" = WeakValueDictionary()
+
 def _parse_hhmm(s: str) -> time:
     h, m = s.split(":")
     return time(int(h), int(m), tzinfo=JST)
 
-def fetch_events_yyyymmdd(ics_url: str, target: date) -> List[Tuple[datetime, datetime]]:
-    r = requests.get(ics_url, timeout=10)
-    r.raise_for_status()
-    cal = Calendar(r.text)
-    day_start = datetime.combine(target, time(0,0,tzinfo=JST))
-    day_end   = datetime.combine(target, time(23,59,tzinfo=JST))
-    spans: List[Tuple[datetime, datetime]] = []
-    for e in cal.events:
-        start = e.begin.astimezone(JST).datetime
-        end   = e.end.astimezone(JST).datetime
-        if end < day_start or start > day_end: continue
-        s = max(start, day_start); t = min(end, day_end)
-        if s < t: spans.append((s, t))
-    spans.sort(key=lambda x: x[0])
-    merged: List[Tuple[datetime, datetime]] = []
+def _merge(spans: List[Span]) -> List[Span]:
+    spans = sorted(spans, key=lambda x: x[0])
+    merged: List[Span] = []
     for s, t in spans:
         if not merged or s > merged[-1][1]:
             merged.append((s, t))
@@ -33,23 +55,132 @@ def fetch_events_yyyymmdd(ics_url: str, target: date) -> List[Tuple[datetime, da
             ps, pt = merged[-1]; merged[-1] = (ps, max(pt, t))
     return merged
 
+def _parse_events(text: str) -> List[Span]:
+    from ics import Calendar  # 重いので初回のICS取得まで読み込まない
+    cal = Calendar(text)
+    spans: List[Span] = []
+    for e in cal.events:
+        start = e.begin.to(JST).datetime
+        end   = e.end.to(JST).datetime
+        if start < end: spans.append((start, end))
+    return _merge(spans)
+
+def _cache_get(ics_url: str) -> Optional[_Feed]:
+    with _feeds_lock:
+        feed = _feeds.get(ics_url)
+        if feed is not None:
+            _feeds.move_to_end(ics_url)
+        return feed
+
+def _cache_put(ics_url: str, feed: _Feed) -> None:
+    with _feeds_lock:
+        _feeds[ics_url] = feed
+        _feeds.move_to_end(ics_url)
+        while len(_feeds) > ICS_CACHE_MAX_FEEDS:
+            _feeds.popitem(last=False)
+
+def _fetch_lock(ics_url: str) -> _FetchLock:
+    with _feeds_lock:
+        entry = _fetch_locks.get(ics_url)
+        if entry is None:
+            entry = _fetch_locks[ics_url] = _FetchLock()
+        return entry
+
+def clear_feed_cache() -> None:
+    with _feeds_lock:
+        _feeds.clear()
+
+def _fresh(feed: Optional[_Feed], now: float) -> bool:
+    return feed is not None and now - feed.checked_at < ICS_CACHE_TTL_SEC
+
+def load_busy_index(ics_url: str) -> List[Span]:
+    """ICSフィードの予定を開始順にマージした busy 区間(JST)。TTL内はメモリから返し、期限切れ後は条件付きGETで再検証する。
+    取得は URL ごとに1つのリクエストだけが行い、同時に来た他のリクエストはその結果を待って使う。"""
+    feed = _cache_get(ics_url)
+    if _fresh(feed, _time.monotonic()):
+        return feed.events
+    entry = _fetch_lock(ics_url)  # 待っている間も参照を持ち続ける(弱参照の表から消えないように)
+    with entry.lock:
+        # 待っている間に別のリクエストが取得し終えていれば、それを使う
+        feed = _cache_get(ics_url)
+        now = _time.monotonic()
+        if _fresh(feed, now):
+            return feed.events
+        return _refresh(ics_url, feed, now)
+
+def _refresh(ics_url: str, feed: Optional[_Feed], now: float) -> List[Span]:
+    import requests
+    headers = {}
+    if feed is not None:
+        if feed.etag: headers["If-None-Match"] = feed.etag
+        if feed.last_modified: headers["If-Modified-Since"] = feed.last_modified
+    try:
+        with timed(ics_latency, "ics", kind="fetch") as labels:
+            r = requests.get(ics_url, timeout=10, headers=headers)
+            labels["outcome"] = str(r.status_code)
+        if r.status_code >= 500:
+            r.raise_for_status()
+    except requests.RequestException:
+        if feed is None:
+            raise
+        # 再検証に失敗(5xx・タイムアウト・接続エラー): 手元の予定を返し、次の再検証は TTL 後にする
+        log.warning("ICS revalidation failed; serving cached events: %s", ics_url, exc_info=True)
+        feed.checked_at = now
+        return feed.events
+    if r.status_code == 304 and feed is not None:
+        feed.checked_at = now
+        return feed.events
+    r.raise_for_status()
+    with timed(ics_latency, "ics_parse", kind="parse"):
+        events = _parse_events(r.text)
+    _cache_put(ics_url, _Feed(events=events, etag=r.headers.get("ETag"), last_modified=r.headers.get("Last-Modified"), checked_at=now))
+    return events
+
+def fetch_events_yyyymmdd(ics_url: str, target: date) -> List[Span]:
+    day_start = datetime.combine(target, time(0,0,tzinfo=JST))
+    day_end   = datetime.combine(target, time(23,59,tzinfo=JST))
+    busy = load_busy_index(ics_url)
+    spans: List[Span] = []
+    for start, end in busy[bisect_right(busy, day_start, key=lambda x: x[1]):]:
+        if start > day_end: break
+        s = max(start, day_start); t = min(end, day_end)
+        if s < t: spans.append((s, t))
+    return spans
+
+def _minutes(s: datetime, t: datetime) -> int:
+    return int((t - s).total_seconds() // 60)
+
+def free_blocks_range(ics_url: str, start: date, end: date, work_start: str, work_end: str, min_block: int = 15) -> List[Dict[str, Any]]:
+    """start〜end の各日について空き時間(分)と空きブロックを返す。busy 区間を日付順に1回だけ走査する。"""
+    busy = load_busy_index(ics_url)
+    ws_t = _parse_hhmm(work_start); we_t = _parse_hhmm(work_end)
+    days: List[Dict[str, Any]] = []
+    i = 0; n = len(busy)
+    d = start
+    while d <= end:
+        ws = datetime.combine(d, ws_t); we = datetime.combine(d, we_t)
+        if we <= ws:
+            days.append({"date": d.isoformat(), "available_minutes": 0, "blocks": []})
+            d += timedelta(days=1); continue
+        while i < n and busy[i][1] <= ws: i += 1
+        busy_sum = 0; cursor = ws; blocks = []
+        j = i
+        while j < n and busy[j][0] < we:
+            s = max(busy[j][0], ws); t = min(busy[j][1], we)
+            if _minutes(cursor, s) >= min_block:
+                blocks.append((cursor, s))
+            busy_sum += _minutes(s, t); cursor = t
+            j += 1
+        if _minutes(cursor, we) >= min_block:
+            blocks.append((cursor, we))
+        free = max(0, _minutes(ws, we) - busy_sum)
+        days.append({
+            "date": d.isoformat(),
+            "available_minutes": (free // min_block) * min_block,
+            "blocks": [{"start": s.strftime("%H:%M"), "end": t.strftime("%H:%M"), "minutes": _minutes(s, t)} for s, t in blocks],
+        })
+        d += timedelta(days=1)
+    return days
+
 def free_minutes_between(ics_url: str, target: date, work_start: str, work_end: str, min_block: int = 15) -> int:
-    spans = fetch_events_yyyymmdd(ics_url, target)
-    ws = datetime.combine(target, _parse_hhmm(work_start))
-    we = datetime.combine(target, _parse_hhmm(work_end))
-    if we <= ws: return 0
-    busy = []
-    for s, t in spans:
-        if t <= ws or s >= we: continue
-        busy.append((max(s, ws), min(t, we)))
-    busy.sort(key=lambda x: x[0])
-    merged = []
-    for s, t in busy:
-        if not merged or s > merged[-1][1]: merged.append((s, t))
-        else:
-            ps, pt = merged[-1]; merged[-1] = (ps, max(pt, t))
-    total = int((we - ws).total_seconds() // 60)
-    busy_sum = sum(int((t - s).total_seconds() // 60) for s, t in merged)
-    free = max(0, total - busy_sum)
-    free = (free // min_block) * min_block
-    return free
+    return free_blocks_range(ics_url, target, target, work_start, work_end, min_block)[0]["available_minutes"]
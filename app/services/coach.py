@@ -1,22 +1,99 @@
 from __future__ import annotations
-from typing import List, Dict, Any
-from app.core.ai import generate_text
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple
+from app.core.ai import generate_many, agenerate_many, dummy_generate, Prompt
 
 SYSTEM_COACH = "あなたは優秀なパーソナルプロダクティビティコーチ。短く実行的に話す。"
 SYSTEM_SUMMARY = "あなたは簡潔で実用的なレビュー編集者。要約は箇条書き、改善案は動詞から始める。"
 
-def coach_line_for_task(title: str, effort_min: int, context: dict | None = None) -> str:
+COACH_MEMO_MAX = int(os.getenv("COACH_MEMO_MAX", "512"))
+COACH_BATCH_SIZE = int(os.getenv("COACH_BATCH_SIZE", "8"))
+
+_coach_memo: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+_coach_memo_lock = threading.Lock()
+_numbered = re.compile(r"^\s*(\d+)\s*[.)．：:、]\s*(.+)$")
+
+def _memo_get(key: Tuple[str, int]) -> str | None:
+    with _coach_memo_lock:
+        line = _coach_memo.get(key)
+        if line is not None:
+            _coach_memo.move_to_end(key)
+        return line
+
+def _memo_put(key: Tuple[str, int], line: str) -> None:
+    with _coach_memo_lock:
+        _coach_memo[key] = line
+        _coach_memo.move_to_end(key)
+        while len(_coach_memo) > COACH_MEMO_MAX:
+            _coach_memo.popitem(last=False)
+
+def _coach_prompt(title: str, effort_min: int) -> Prompt:
     user = (f"タスク: {title}\n"
             f"想定時間: {effort_min}分\n"
             "出力: 20字以内の日本語で『今すぐ始められる一言』を1つ。句読点は1つまで。")
-    text = generate_text(SYSTEM_COACH, user, max_tokens=50)
-    return (text or "まず2分だけ、見出しを書こう。").strip()
+    return (SYSTEM_COACH, user, 50)
+
+def _coach_batch_prompt(tasks: List[Tuple[str, int]]) -> Prompt:
+    listing = "\n".join(f"{k+1}. {title}（想定{effort}分）" for k, (title, effort) in enumerate(tasks))
+    user = (f"タスク一覧:\n{listing}\n"
+            "出力: 各タスクについて20字以内の日本語で『今すぐ始められる一言』を1つずつ。"
+            "句読点は1つまで。『番号. 一言』の形式で1行ずつ、番号はタスク一覧と同じ。")
+    return (SYSTEM_COACH, user, 40 * len(tasks) + 20)
+
+def _parse_numbered(raw: str, n: int) -> Dict[int, str]:
+    out: Dict[int, str] = {}
+    for ln in (raw or "").splitlines():
+        mt = _numbered.match(ln)
+        if not mt: continue
+        idx = int(mt.group(1)) - 1
+        text = mt.group(2).strip()
+        if 0 <= idx < n and text and idx not in out:
+            out[idx] = text
+    return out
+
+def _no_line(system: str, user: str, max_tokens: int) -> str:
+    return ""
+
+def _fallback_line(title: str, effort_min: int) -> str:
+    """LLMが使えない・応答が無かったタスクの一言。まとめたかどうかによらず同じ文言にする。"""
+    return dummy_generate(*_coach_prompt(title, effort_min))
+
+def _coach_plan(tasks: List[Tuple[str, int]]) -> Tuple[List[str | None], List[List[int]], List[Prompt]]:
+    lines: List[str | None] = [_memo_get((t, e)) for t, e in tasks]
+    missing = [i for i, ln in enumerate(lines) if ln is None]
+    chunks = [missing[k:k + COACH_BATCH_SIZE] for k in range(0, len(missing), COACH_BATCH_SIZE)]
+    prompts = [_coach_prompt(*tasks[c[0]]) if len(c) == 1 else _coach_batch_prompt([tasks[i] for i in c]) for c in chunks]
+    return lines, chunks, prompts
+
+def _coach_fill(tasks: List[Tuple[str, int]], lines: List[str | None], chunks: List[List[int]],
+                prompts: List[Prompt], raws: List[str]) -> List[str]:
+    for chunk, prompt, raw in zip(chunks, prompts, raws):
+        if len(chunk) == 1:
+            # 1件だけのプロンプトは generate_text 経由で、失敗・遮断・AI無効のとき dummy_generate が返る。それはプロバイダの出力ではないのでメモしない
+            parsed = {0: raw.strip()} if raw and raw.strip() and raw != dummy_generate(*prompt) else {}
+        else:
+            parsed = _parse_numbered(raw, len(chunk))
+        for k, i in enumerate(chunk):
+            if k in parsed:
+                lines[i] = parsed[k]
+                _memo_put(tasks[i], parsed[k])
+    return [ln or _fallback_line(*tasks[i]) for i, ln in enumerate(lines)]
+
+async def acoach_lines_for_tasks(tasks: List[Tuple[str, int]], deadline_sec: float | None = None) -> List[str]:
+    """(title, effort_min) の並びに対する一言をまとめて返す。
+    メモ済みのタスクはLLMを呼ばず、残りは COACH_BATCH_SIZE 件ずつ1プロンプトにまとめて並列に生成する。"""
+    lines, chunks, prompts = _coach_plan(tasks)
+    raws = await agenerate_many(prompts, deadline_sec, fallback=_no_line)
+    return _coach_fill(tasks, lines, chunks, prompts, raws)
 
-def summarize_reflections(items: List[Dict[str, Any]], days: int = 7) -> Dict[str, Any]:
+def summarize_reflections(items: List[Dict[str, Any]], days: int = 7, deadline_sec: float | None = None) -> Dict[str, Any]:
     join_text = "\n".join([f"- {it['date']} (mood={it.get('mood','-')}) {(it.get('text') or '')[:240]}" for it in items])
     user = (f"直近{days}日のメモ:\n{join_text}\n\n"
             "出力: 1) 要約（80字以内, 箇条書き2点まで） 2) 改善案3つ（各15字以内, 動詞始まり）")
-    raw = generate_text(SYSTEM_SUMMARY, user, max_tokens=180)
+    raw = generate_many([(SYSTEM_SUMMARY, user, 180)], deadline_sec)[0]
     summary = []; improvements = []
     if raw:
         lines = [x.strip("-・* \n") for x in raw.splitlines() if x.strip()]
@@ -0,0 +1,77 @@
+from __future__ import annotations
+from collections import defaultdict
+from datetime import date
+from typing import Any, Dict, List
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app import models as m
+from app.core import ai
+from app.core.ai import generate_many, dummy_generate, Prompt
+from app.services.coach import summarize_reflections
+
+SYSTEM_DIGEST = "あなたは簡潔な日誌編集者。事実と気分を短くまとめる。"
+DIGEST_ENTRY_CHARS = 400   # 1日のプロンプトに入れる1件あたりの最大文字数
+DIGEST_EXTRACT_CHARS = 160
+
+# 日別ダイジェスト(map)を保存しておき、期間の要約(reduce)はダイジェストだけから作る。
+# 日別集計(reflection_daily)の count/latest_id が変わった日だけ作り直すので、繰り返しの分析は新しい日の分だけ LLM を呼ぶ。
+
+def digest_kind() -> str:
+    return f"{ai.LLM_PROVIDER}:{ai.OPENAI_MODEL}" if ai.AI_ENABLED and ai.OPENAI_API_KEY else "extract"
+
+def _day_prompt(day: date, texts: List[str], avg_mood: float) -> Prompt:
+    memo = "\n".join(f"- {t[:DIGEST_ENTRY_CHARS]}" for t in texts)
+    user = (f"{day.isoformat()} のメモ（{len(texts)}件, 平均mood={avg_mood:.1f}）:\n{memo}\n\n"
+            "出力: この日の出来事・気分・気づきを60字以内の日本語1行で。")
+    return (SYSTEM_DIGEST, user, 80)
+
+def _extract(texts: List[str]) -> str:
+    """LLMを使わない(使えない)ときのダイジェスト。各メモの先頭をつなげる。"""
+    out = " / ".join(t.strip()[:80] for t in texts if t.strip())
+    return out[:DIGEST_EXTRACT_CHARS] or "（メモなし）"
+
+def daily_digests(db: Session, user_id: int, start: date, end: date | None = None,
+                  deadline_sec: float | None = None) -> List[Dict[str, Any]]:
+    """[start, end] の日別ダイジェストを新しい日から順に返す。無い日/古い日だけ生成して保存する。"""
+    D, G = m.ReflectionDaily, m.ReflectionDigest
+    cond = [D.user_id == user_id, D.date >= start] + ([D.date <= end] if end else [])
+    days = db.execute(select(D.date, D.count, D.mood_sum, D.latest_id).where(*cond).order_by(D.date.desc())).all()
+    if not days:
+        return []
+    kind = digest_kind()
+    stored = {r.date: r for r in db.execute(
+        select(G.date, G.count, G.latest_id, G.kind, G.digest).where(G.user_id == user_id, G.date.in_([d.date for d in days])))}
+    stale = [d for d in days if (s := stored.get(d.date)) is None or (s.count, s.latest_id, s.kind) != (d.count, d.latest_id, kind)]
+    fresh: Dict[date, tuple] = {}
+    if stale:
+        R = m.Reflection
+        texts: Dict[date, List[str]] = defaultdict(list)
+        rows = db.execute(select(R.date, R.text).where(R.user_id == user_id, R.date.in_([d.date for d in stale])).order_by(R.date, R.id))
+        for day, text in rows:
+            texts[day].append(text or "")
+        db.commit()  # 読み込みはここまで。LLM の応答を待つ間は接続を返す
+        # map: 古くなった日のダイジェストを並列に生成(期限切れ・失敗は抜粋で代用)
+        prompts = [_day_prompt(d.date, texts[d.date], d.mood_sum / d.count) for d in stale]
+        outs = generate_many(prompts, deadline_sec, fallback=lambda *p: "") if kind != "extract" else [""] * len(stale)
+        for d, p, out in zip(stale, prompts, outs):
+            out = (out or "").strip()
+            ok = bool(out) and out != dummy_generate(*p)
+            fresh[d.date] = (out if ok else _extract(texts[d.date]), kind if ok else "extract")
+        for d in stale:
+            digest, k = fresh[d.date]
+            stmt = sqlite_insert(G).values(user_id=user_id, date=d.date, count=d.count, latest_id=d.latest_id, kind=k, digest=digest)
+            stmt = stmt.on_conflict_do_update(index_elements=[G.user_id, G.date], set_={
+                "count": stmt.excluded.count, "latest_id": stmt.excluded.latest_id, "kind": stmt.excluded.kind,
+                "digest": stmt.excluded.digest, "created_at": stmt.excluded.created_at})
+            db.execute(stmt)
+    db.commit()  # 呼び出し側が続けて LLM を呼ぶ(reduce)ので、ここでも接続を返しておく
+    return [{"date": d.date.isoformat(), "count": d.count, "mood": round(d.mood_sum / d.count, 1),
+             "text": fresh[d.date][0] if d.date in fresh else stored[d.date].digest} for d in days]
+
+def summarize_window(db: Session, user_id: int, start: date, days: int, deadline_sec: float | None = None) -> Dict[str, Any]:
+    """reduce: 保存済みの日別ダイジェストから期間の要約と改善案を作る。"""
+    digests = daily_digests(db, user_id, start, deadline_sec=deadline_sec)
+    res = summarize_reflections(digests, days=days, deadline_sec=deadline_sec)
+    res["count"] = sum(d["count"] for d in digests)
+    return res
@@ -0,0 +1,24 @@
+from __future__ import annotations
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app import models as m
+
+def acquire(db: Session, name: str, owner: str, ttl_sec: float) -> bool:
+    """リースを取得または延長する。空き・期限切れ・自分が保持中なら True。
+    判定と更新は1文の UPSERT で行うので、複数プロセスが同時に呼んでも取得できるのは1つだけ。"""
+    now = datetime.utcnow()
+    stmt = sqlite_insert(m.Lease).values(name=name, owner=owner, expires_at=now + timedelta(seconds=ttl_sec))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[m.Lease.name],
+        set_={"owner": stmt.excluded.owner, "expires_at": stmt.excluded.expires_at},
+        where=(m.Lease.owner == stmt.excluded.owner) | (m.Lease.expires_at < now),
+    )
+    acquired = db.execute(stmt).rowcount == 1
+    db.commit()
+    return acquired
+
+def release(db: Session, name: str, owner: str) -> None:
+    db.execute(delete(m.Lease).where(m.Lease.name == name, m.Lease.owner == owner))
+    db.commit()
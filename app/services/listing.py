@@ -0,0 +1,15 @@
+from __future__ import annotations
+from typing import Iterable, Mapping, Sequence, Tuple
+from fastapi.responses import ORJSONResponse
+from app import models as m
+from app.schemas import GoalOut, TaskOut
+
+# 一覧APIの高速経路: ORM オブジェクトと Pydantic 検証を経由せず、列のタプルをそのまま orjson で返す。
+# 列はレスポンススキーマのフィールド順に並べるので、出力は response_model 経由と同じバイト列になる。
+GOAL_FIELDS: Tuple[str, ...] = tuple(GoalOut.model_fields)
+TASK_FIELDS: Tuple[str, ...] = tuple(TaskOut.model_fields)
+GOAL_COLUMNS = tuple(getattr(m.Goal, f) for f in GOAL_FIELDS)
+TASK_COLUMNS = tuple(getattr(m.Task, f) for f in TASK_FIELDS)
+
+def rows_response(rows: Iterable[Sequence], fields: Tuple[str, ...], headers: Mapping[str, str] | None = None) -> ORJSONResponse:
+    return ORJSONResponse([dict(zip(fields, row)) for row in rows], headers=dict(headers or {}))
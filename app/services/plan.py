@@ -3,9 +3,9 @@ from datetime import datetime, date
 from math import log
 from typing import List, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import select, case, func
 from app import models as m
-from app.services.coach import coach_line_for_task
+from app.services.coach import acoach_lines_for_tasks
 
 def _proximity(due: date | None, today: date) -> float:
     if due is None:
@@ -18,32 +18,55 @@ def _proximity(due: date | None, today: date) -> float:
     if days_left <= 14: return 0.6
     return 0.3
 
+W_DEADLINE = 1.0; W_IMPACT = 1.2; W_EFFORT = 0.6
+PICK_PAGE = 16
+
 def _score(impact: int, effort_min: int, due: date | None, today: date) -> float:
-    w_deadline = 1.0; w_impact = 1.2; w_effort = 0.6
-    return (w_deadline * _proximity(due, today) + w_impact * max(1, impact) - w_effort * log(1 + max(1, effort_min)))
+    return (W_DEADLINE * _proximity(due, today) + W_IMPACT * max(1, impact) - W_EFFORT * log(1 + max(1, effort_min)))
+
+def _score_sql(today: date):
+    """_score と同じ式のSQL版。ORDER BY ... LIMIT でSQLite側の上位k件ソートに載せる。"""
+    days_left = func.julianday(m.Task.due) - func.julianday(today.isoformat())
+    proximity = case(
+        (m.Task.due.is_(None), 0.0),
+        (days_left < 0, 2.0), (days_left == 0, 1.8), (days_left <= 3, 1.5),
+        (days_left <= 7, 1.0), (days_left <= 14, 0.6),
+        else_=0.3,
+    )
+    impact = func.max(1, func.coalesce(func.nullif(m.Task.impact, 0), 1))
+    effort = func.max(1, func.coalesce(func.nullif(m.Task.effort_min, 0), 30))
+    return W_DEADLINE * proximity + W_IMPACT * impact - W_EFFORT * func.ln(1 + effort)
 
-def _coach_line(title: str, effort_min: int) -> str:
-    return coach_line_for_task(title, effort_min)
+async def _acoach_lines(tasks: List[m.Task], deadline_sec: float | None = None) -> List[str]:
+    return await acoach_lines_for_tasks([(t.title, t.effort_min or 30) for t in tasks], deadline_sec)
 
-def pick_today_tasks(db: Session, user: m.User, minutes_available: int = 90, today: date | None = None) -> List[Tuple[m.Task, float]]:
+def pick_today_tasks(db: Session, user: m.User, minutes_available: int = 90, today: date | None = None, k: int = 3) -> List[Tuple[m.Task, float]]:
+    """スコア順に予算内で最大k件を選ぶ。スコア計算と並べ替えはSQLで行い、上位の行だけをページ単位で読む。"""
     if today is None:
         today = datetime.now().date()
-    stmt = select(m.Task).join(m.Goal, m.Task.goal_id == m.Goal.id).where(m.Goal.user_id == user.id).where(m.Task.status != "done")
-    tasks = db.execute(stmt).scalars().all()
-    scored: List[Tuple[m.Task, float]] = []
-    for t in tasks:
-        s = _score(t.impact or 1, t.effort_min or 30, t.due, today)
-        scored.append((t, s))
-    scored.sort(key=lambda x: x[1], reverse=True)
-    picked: List[Tuple[m.Task, float]] = []
+    score = _score_sql(today).label("score")
+    stmt = (select(m.Task.id, m.Task.effort_min, score)
+            .join(m.Goal, m.Task.goal_id == m.Goal.id)
+            .where(m.Goal.user_id == user.id).where(m.Task.status != "done")
+            .order_by(score.desc(), m.Task.id))
+    picked: List[Tuple[int, float]] = []
     remain = max(1, minutes_available)
-    for t, s in scored:
-        e = t.effort_min if (t.effort_min and t.effort_min > 0) else 30
-        if e <= remain or not picked:
-            picked.append((t, s)); remain -= e
-        if len(picked) >= 3:
+    offset = 0; page = max(PICK_PAGE, k)
+    while len(picked) < k and remain > 0:
+        rows = db.execute(stmt.limit(page).offset(offset)).all()
+        for task_id, effort_min, s in rows:
+            e = effort_min if (effort_min and effort_min > 0) else 30
+            if e <= remain or not picked:
+                picked.append((task_id, s)); remain -= e
+            if len(picked) >= k:
+                break
+        if len(rows) < page:
             break
-    return picked
+        offset += page; page *= 4
+    if not picked:
+        return []
+    tasks = {t.id: t for t in db.execute(select(m.Task).where(m.Task.id.in_([i for i, _ in picked]))).scalars()}
+    return [(tasks[i], s) for i, s in picked]
 
 def get_or_create_demo_user(db: Session) -> m.User:
     user = db.execute(select(m.User).where(m.User.email == "demo@example.com")).scalar_one_or_none()
@@ -0,0 +1,41 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import List, Tuple
+from app.schemas import PlanItem
+
+PLAN_CACHE_MAX = int(os.getenv("PLAN_CACHE_MAX", "256"))
+PLAN_CACHE_TTL_SEC = int(os.getenv("PLAN_CACHE_TTL_SEC", "600"))
+
+Key = Tuple[int, date, int]  # (user_id, date, minutes_available)
+
+_plans: "OrderedDict[Key, Tuple[int, float, List[PlanItem]]]" = OrderedDict()
+_lock = threading.Lock()
+
+def get_plan(user_id: int, day: date, minutes: int, version: int) -> List[PlanItem] | None:
+    """version は目標・タスクのバージョン。計算時と違えば(=その後に書き込みがあれば)無効。"""
+    key = (user_id, day, minutes)
+    with _lock:
+        hit = _plans.get(key)
+        if hit is None:
+            return None
+        if hit[0] != version or time.monotonic() - hit[1] > PLAN_CACHE_TTL_SEC:
+            del _plans[key]
+            return None
+        _plans.move_to_end(key)
+        return list(hit[2])
+
+def put_plan(user_id: int, day: date, minutes: int, version: int, items: List[PlanItem]) -> None:
+    key = (user_id, day, minutes)
+    with _lock:
+        _plans[key] = (version, time.monotonic(), list(items))
+        _plans.move_to_end(key)
+        while len(_plans) > PLAN_CACHE_MAX:
+            _plans.popitem(last=False)
+
+def clear() -> None:
+    with _lock:
+        _plans.clear()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from datetime import date
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app import models as m
+
+BACKFILL_SQL = (
+    "INSERT INTO reflection_daily (user_id, date, count, mood_sum, latest_id)"
+    " SELECT user_id, date, COUNT(*), SUM(mood), MAX(id) FROM reflections GROUP BY user_id, date"
+)
+
+@dataclass
+class WindowStats:
+    count: int
+    mood_sum: int
+    latest_id: int | None
+    latest_date: date | None
+
+    @property
+    def avg_mood(self) -> float | None:
+        return round(self.mood_sum / self.count, 2) if self.count else None
+
+def record_reflection(db: Session, ref: m.Reflection) -> None:
+    """保存した振り返りを日別集計に加える(呼び出し側のトランザクション内。ref.id が必要なので flush 後に呼ぶ)。"""
+    stmt = sqlite_insert(m.ReflectionDaily).values(user_id=ref.user_id, date=ref.date, count=1, mood_sum=ref.mood, latest_id=ref.id)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[m.ReflectionDaily.user_id, m.ReflectionDaily.date],
+        set_={
+            "count": m.ReflectionDaily.count + 1,
+            "mood_sum": m.ReflectionDaily.mood_sum + stmt.excluded.mood_sum,
+            "latest_id": func.max(m.ReflectionDaily.latest_id, stmt.excluded.latest_id),
+        },
+    )
+    db.execute(stmt)
+
+def window_stats(db: Session, user_id: int, start: date, end: date | None = None) -> WindowStats:
+    """[start, end] の件数・気分合計・最新の振り返りIDを日別集計から求める(日数に比例、本文は読まない)。"""
+    D = m.ReflectionDaily
+    cond = [D.user_id == user_id, D.date >= start] + ([D.date <= end] if end else [])
+    count, mood_sum = db.execute(select(func.coalesce(func.sum(D.count), 0), func.coalesce(func.sum(D.mood_sum), 0)).where(*cond)).one()
+    latest = db.execute(select(D.latest_id, D.date).where(*cond).order_by(D.date.desc()).limit(1)).first()
+    return WindowStats(count=count, mood_sum=mood_sum, latest_id=latest[0] if latest else None, latest_date=latest[1] if latest else None)
+
+def ensure_reflection_daily(engine: Engine) -> int:
+    """集計テーブルが空で振り返りがある場合に一括で作り直す(既存DBの初回起動用)。作成した行数を返す。"""
+    with engine.begin() as conn:
+        if conn.exec_driver_sql("SELECT 1 FROM reflection_daily LIMIT 1").first():
+            return 0
+        return conn.exec_driver_sql(BACKFILL_SQL).rowcount
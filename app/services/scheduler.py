@@ -1,30 +1,116 @@
 # app/services/scheduler.py
 from __future__ import annotations
+import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.core.db import SessionLocal
+from app.core.db import SessionLocal, SQLALCHEMY_DATABASE_URL
+from app import models as m
 from app.services.weekly_review import upsert_this_week
 
+log = logging.getLogger(__name__)
+
+WEEKLY_POOL_SIZE = int(os.getenv("WEEKLY_POOL_SIZE", "4"))
+WEEKLY_CHUNK_SIZE = int(os.getenv("WEEKLY_CHUNK_SIZE", "200"))
+# 停止中に過ぎた実行は、この秒数以内なら起動時に1回だけ(coalesce)追いかけて実行する
+WEEKLY_MISFIRE_GRACE_SEC = int(os.getenv("WEEKLY_MISFIRE_GRACE_SEC", str(6 * 24 * 3600)))
+SCHEDULER_JOBSTORE_URL = os.getenv("SCHEDULER_JOBSTORE_URL", SQLALCHEMY_DATABASE_URL)
+
 scheduler: BackgroundScheduler | None = None
+# stop_scheduler(cancel=True) で立てる。実行中の週次ジョブは未着手のユーザーを飛ばして早めに終わる
+_cancel = threading.Event()
+# リーダーであることの確認(app.worker がリースの延長を渡す)。チャンクの合間に呼び、False なら打ち切る
+_still_leader: Callable[[], bool] | None = None
 
-def _job_weekly_review():
+def _user_id_chunks(chunk_size: int) -> Iterator[List[int]]:
+    """全ユーザーのIDを id 順のキーセットで chunk_size 件ずつ返す。"""
+    last = 0
+    while True:
+        db: Session = SessionLocal()
+        try:
+            ids = list(db.scalars(select(m.User.id).where(m.User.id > last).order_by(m.User.id).limit(chunk_size)))
+        finally:
+            db.close()
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+def _weekly_for_user(user_id: int) -> bool:
+    if _cancel.is_set():
+        return False
     db: Session = SessionLocal()
     try:
-        upsert_this_week(db)
+        user = db.get(m.User, user_id)
+        if user:
+            upsert_this_week(db, user)
+        return True
     finally:
         db.close()
 
-def start_scheduler():
+def _interrupted() -> bool:
+    return _cancel.is_set() or (_still_leader is not None and not _still_leader())
+
+def run_weekly_reviews(pool_size: int | None = None, chunk_size: int | None = None) -> Dict[str, int]:
+    """全ユーザーの週次レビューを作る。ユーザーはチャンク単位で読み、各チャンクをスレッドプールで並列に処理する。"""
+    done = failed = skipped = 0
+    with ThreadPoolExecutor(max_workers=max(1, pool_size or WEEKLY_POOL_SIZE), thread_name_prefix="weekly") as pool:
+        for ids in _user_id_chunks(max(1, chunk_size or WEEKLY_CHUNK_SIZE)):
+            if _interrupted():
+                # リースを失った: 別のリーダーが同じ実行を始めうるので、残りのチャンクには手を付けない
+                log.warning("weekly review interrupted before user_id=%s", ids[0])
+                break
+            for uid, fut in [(uid, pool.submit(_weekly_for_user, uid)) for uid in ids]:
+                try:
+                    if fut.result(): done += 1
+                    else: skipped += 1
+                except Exception:
+                    failed += 1
+                    log.exception("weekly review failed: user_id=%s", uid)
+    log.info("weekly review finished: done=%d failed=%d skipped=%d", done, failed, skipped)
+    return {"done": done, "failed": failed, "skipped": skipped}
+
+def _job_weekly_review():
+    run_weekly_reviews()
+
+def start_scheduler(still_leader: Callable[[], bool] | None = None):
     """
-    毎週日曜21:00(JST)に週次レビューを自動生成。
-    Uvicornのリロード多重起動を避けるため、二重起動チェック付き。
+    毎週日曜21:00(JST)に全ユーザーの週次レビューを自動生成。
+    ジョブはDB(apscheduler_jobs)に保存し、停止中に逃した実行は起動時に追いかける。
+    プロセス間の多重実行は app.worker のリースで防ぐ(ここでは同一プロセス内の二重起動だけ確認する)。
     """
-    global scheduler
+    global scheduler, _still_leader
     if scheduler and scheduler.running:
         return
-    scheduler = BackgroundScheduler(timezone="Asia/Tokyo")
+    _cancel.clear(); _still_leader = still_leader
+    scheduler = BackgroundScheduler(
+        timezone="Asia/Tokyo",
+        jobstores={"default": SQLAlchemyJobStore(url=SCHEDULER_JOBSTORE_URL)},
+        job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": WEEKLY_MISFIRE_GRACE_SEC},
+    )
     trigger = CronTrigger(day_of_week="sun", hour=21, minute=0, second=0, timezone="Asia/Tokyo")
-    scheduler.add_job(_job_weekly_review, trigger, id="weekly_review", replace_existing=True)
-    scheduler.start()
+    # 一時停止状態で起動して保存済みジョブを読み込む。replace_existing で登録し直すと次回実行時刻が
+    # 先に進んで逃した実行が消えるので、無い場合だけ追加し、トリガーが変わった場合だけ差し替える
+    scheduler.start(paused=True)
+    job = scheduler.get_job("weekly_review")
+    if job is None:
+        scheduler.add_job(_job_weekly_review, trigger, id="weekly_review")
+    elif str(job.trigger) != str(trigger):
+        scheduler.reschedule_job("weekly_review", trigger=trigger)
+    scheduler.resume()
+
+def stop_scheduler(wait: bool = True, cancel: bool = False):
+    """wait=True なら実行中のジョブの終了を待つ。cancel=True なら実行中のジョブは未着手のユーザーを飛ばして終わる
+    (リースを失ったとき。飛ばしたユーザーの今週分は作られないので、件数をログに出す)。"""
+    global scheduler
+    if cancel:
+        _cancel.set()
+    if scheduler and scheduler.running:
+        scheduler.shutdown(wait=wait)
+    scheduler = None
@@ -0,0 +1,135 @@
+from __future__ import annotations
+import base64
+import json
+from typing import Any, Callable, List, Optional
+from fastapi import HTTPException, Response
+from sqlalchemy import column, func, literal_column, or_, table, text
+from sqlalchemy.engine import Engine
+
+# 日本語は空白で区切られないため trigram トークナイザを使う(3文字未満の語は LIKE にフォールバック)
+FTS_MIN_QUERY_LEN = 3
+
+SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS goals_fts USING fts5(
+        title, why, kgi, content='goals', content_rowid='id', tokenize='trigram')""",
+    """CREATE TRIGGER IF NOT EXISTS goals_fts_ai AFTER INSERT ON goals BEGIN
+        INSERT INTO goals_fts(rowid, title, why, kgi) VALUES (new.id, new.title, new.why, new.kgi);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS goals_fts_ad AFTER DELETE ON goals BEGIN
+        INSERT INTO goals_fts(goals_fts, rowid, title, why, kgi) VALUES ('delete', old.id, old.title, old.why, old.kgi);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS goals_fts_au AFTER UPDATE OF title, why, kgi ON goals BEGIN
+        INSERT INTO goals_fts(goals_fts, rowid, title, why, kgi) VALUES ('delete', old.id, old.title, old.why, old.kgi);
+        INSERT INTO goals_fts(rowid, title, why, kgi) VALUES (new.id, new.title, new.why, new.kgi);
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        title, content='tasks', content_rowid='id', tokenize='trigram')""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title) VALUES (new.id, new.title);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO tasks_fts(rowid, title) VALUES (new.id, new.title);
+    END""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS reflections_fts USING fts5(
+        text, content='reflections', content_rowid='id', tokenize='trigram')""",
+    """CREATE TRIGGER IF NOT EXISTS reflections_fts_ai AFTER INSERT ON reflections BEGIN
+        INSERT INTO reflections_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS reflections_fts_ad AFTER DELETE ON reflections BEGIN
+        INSERT INTO reflections_fts(reflections_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS reflections_fts_au AFTER UPDATE OF text ON reflections BEGIN
+        INSERT INTO reflections_fts(reflections_fts, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO reflections_fts(rowid, text) VALUES (new.id, new.text);
+    END""",
+]
+FTS_TABLES = ("goals_fts", "tasks_fts", "reflections_fts")
+
+goals_fts = table("goals_fts", column("rowid"))
+tasks_fts = table("tasks_fts", column("rowid"))
+reflections_fts = table("reflections_fts", column("rowid"))
+
+HIGHLIGHT = ("<mark>", "</mark>")
+SNIPPET_TOKENS = 16
+
+fts_enabled = False
+
+def ensure_search_index(engine: Engine) -> bool:
+    """FTS5テーブルとトリガーを用意する(冪等)。新規作成したテーブルは既存行から索引を作り直す。
+    SQLite に FTS5 が無い環境では False を返し、検索は LIKE にフォールバックする。"""
+    global fts_enabled
+    try:
+        with engine.begin() as conn:
+            existing = set(conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (%s)"
+                % ", ".join(f"'{n}'" for n in FTS_TABLES)).scalars())
+            for ddl in SEARCH_DDL:
+                conn.exec_driver_sql(ddl)
+            for name in FTS_TABLES:
+                if name not in existing:
+                    conn.exec_driver_sql(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+    except Exception:
+        fts_enabled = False
+        return False
+    fts_enabled = True
+    return True
+
+def match_query(q: str | None) -> str | None:
+    """FTS5 の MATCH 式(フレーズ検索)。FTSが使えない/語が短すぎる場合は None。"""
+    q = (q or "").strip()
+    if not fts_enabled or len(q) < FTS_MIN_QUERY_LEN:
+        return None
+    return '"' + q.replace('"', '""') + '"'
+
+def match(fts_name: str, expr: str):
+    return text(f"{fts_name} MATCH :{fts_name}_q").bindparams(**{f"{fts_name}_q": expr})
+
+def bm25(fts_name: str):
+    return func.bm25(literal_column(fts_name))
+
+def snippet(fts_name: str, column_index: int = 0):
+    return func.snippet(literal_column(fts_name), column_index, HIGHLIGHT[0], HIGHLIGHT[1], "…", SNIPPET_TOKENS)
+
+def plain_snippet(text: str, q: str, width: int = 24) -> str:
+    """FTSを使わない検索用に、snippet() と同じ形の抜粋を作る。"""
+    pos = text.lower().find(q.lower())
+    if pos < 0:
+        return text[: width * 2] + ("…" if len(text) > width * 2 else "")
+    start = max(0, pos - width); end = min(len(text), pos + len(q) + width)
+    return (("…" if start > 0 else "") + text[start:pos] + HIGHLIGHT[0] + text[pos:pos + len(q)] + HIGHLIGHT[1]
+            + text[pos + len(q):end] + ("…" if end < len(text) else ""))
+
+def contains_any(q: str, *columns):
+    """FTSを使わない(短い語の)検索条件。FTSテーブルと同じ列を渡し、どれかに q を含む行に一致させる。"""
+    return or_(*(c.contains(q, autoescape=True) for c in columns))
+
+def encode_cursor(*values: Any) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode().rstrip("=")
+
+def decode_cursor(token: str, size: int) -> List[Any]:
+    """不正なカーソルは ValueError。"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("invalid cursor")
+    return values
+
+def cursor_or_400(token: str, size: int) -> List[Any]:
+    """decode_cursor のルーター向け版。不正なカーソルは 400。"""
+    try:
+        return decode_cursor(token, size)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+def paginate(rows: list, limit: Optional[int], response: Response, key: Callable[[Any], tuple]) -> list:
+    """limit+1 件取得した rows を limit 件に切り、続きがあれば X-Next-Cursor ヘッダに次のカーソルを載せる。"""
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(*key(rows[-1]))
+    return rows
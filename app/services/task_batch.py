@@ -0,0 +1,66 @@
+from __future__ import annotations
+from typing import List
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+from app import models as m
+from app.schemas import TaskBatchCreate, TaskBatchUpdate, TaskBatchItemResult, TaskBatchResult
+from app.services.versions import bump_version, GOALS
+
+# NULL にできない列(update で null を送られたらその項目をエラーにする)
+_NOT_NULL = ("title", "status", "impact", "effort_min")
+
+def apply_task_batch(db: Session, user: m.User, ops: list) -> TaskBatchResult:
+    """create/update/delete の混在バッチを1トランザクションで適用する。
+    1件でも不正な項目があれば何も書き込まず committed=False で項目ごとの結果を返す。"""
+    # 先にバージョンを上げて書き込みロックを取り、以降の存在確認と書き込みを同じトランザクションで行う
+    bump_version(db, user.id, GOALS)
+    goal_ids = {op.goal_id for op in ops if isinstance(op, TaskBatchCreate)}
+    task_ids = [op.id for op in ops if not isinstance(op, TaskBatchCreate)]
+    own_goals = set(db.scalars(select(m.Goal.id).where(m.Goal.user_id == user.id, m.Goal.id.in_(goal_ids)))) if goal_ids else set()
+    own_tasks = set(db.scalars(select(m.Task.id).join(m.Goal, m.Task.goal_id == m.Goal.id)
+                               .where(m.Goal.user_id == user.id, m.Task.id.in_(task_ids)))) if task_ids else set()
+
+    results: List[TaskBatchItemResult] = []
+    creates, updates, deletes = [], [], []
+    seen: set[int] = set()
+    for i, op in enumerate(ops):
+        error = None
+        if isinstance(op, TaskBatchCreate):
+            if op.goal_id not in own_goals:
+                error = "goal not found"
+            else:
+                creates.append((i, op.model_dump(exclude={"op"})))
+        elif op.id not in own_tasks:
+            error = "task not found"
+        elif op.id in seen:
+            error = "duplicate task id in batch"
+        elif isinstance(op, TaskBatchUpdate):
+            data = op.model_dump(exclude_unset=True, exclude={"op", "id"})
+            if not data:
+                error = "nothing to update"
+            elif any(data.get(k, "") is None for k in _NOT_NULL):
+                error = "null is not allowed for " + ", ".join(k for k in _NOT_NULL if data.get(k, "") is None)
+            else:
+                updates.append((i, {"id": op.id, **data}))
+        else:
+            deletes.append(i)
+        if not isinstance(op, TaskBatchCreate):
+            seen.add(op.id)
+        results.append(TaskBatchItemResult(index=i, op=op.op, ok=error is None, id=getattr(op, "id", None), error=error))
+
+    if any(not r.ok for r in results):
+        db.rollback()
+        return TaskBatchResult(committed=False, results=results)
+
+    if creates:
+        # executemany + RETURNING(パラメータ順で id を受け取る)
+        ids = db.scalars(insert(m.Task).returning(m.Task.id, sort_by_parameter_order=True), [row for _, row in creates]).all()
+        for (i, _), new_id in zip(creates, ids):
+            results[i].id = new_id
+    if updates:
+        # 主キー指定の一括UPDATE(同じ列の組ごとに executemany)
+        db.execute(update(m.Task), [row for _, row in updates])
+    if deletes:
+        db.execute(delete(m.Task).where(m.Task.id.in_([ops[i].id for i in deletes])))
+    db.commit()
+    return TaskBatchResult(committed=True, created=len(creates), updated=len(updates), deleted=len(deletes), results=results)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app import models as m
+
+# リソース名。書き込みのたびに (user, resource) のバージョンを上げ、キャッシュの無効化に使う
+GOALS = "goals"  # 目標・タスク
+REFLECTIONS = "reflections"
+REVIEW = "review"  # 週次レビュー
+INTEGRATION = "integration"
+
+def bump_version(db: Session, user_id: int, resource: str) -> None:
+    """呼び出し側のトランザクション内でバージョンを+1する(commitは呼び出し側)。"""
+    stmt = sqlite_insert(m.CacheVersion).values(user_id=user_id, resource=resource, version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[m.CacheVersion.user_id, m.CacheVersion.resource],
+        set_={"version": m.CacheVersion.version + 1},
+    )
+    db.execute(stmt)
+
+def get_version(db: Session, user_id: int, resource: str) -> int:
+    stmt = select(m.CacheVersion.version).where(m.CacheVersion.user_id == user_id, m.CacheVersion.resource == resource)
+    return db.execute(stmt).scalar_one_or_none() or 0
@@ -1,12 +1,13 @@
 from __future__ import annotations
 import json
 from datetime import date, timedelta
-from typing import List, Optional
+from typing import Any, Iterator, List, Optional, Set
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from app import models as m
 from app.schemas import WbsTask, WbsPlanRequest
-from app.core.ai import generate_text
+from app.core.ai import generate_text, stream_text
+from app.services.versions import bump_version, GOALS
 
 SYSTEM = "あなたは実行計画作成の専門家。短く具体的に、実行順に並べる。"
 
@@ -30,10 +31,57 @@ KGI: {kgi}
 
 では、{max_tasks}件以内で出力してください。"""
 
-def _ai_generate(goal: m.Goal, req: WbsPlanRequest) -> Optional[List[WbsTask]]:
+class _JsonArrayParser:
+    """JSON配列を断片ごとに受け取り、完結したトップレベル要素(オブジェクト)から順に返す。"""
+
+    def __init__(self) -> None:
+        self._started = False
+        self._closed = False
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._buf: List[str] = []
+
+    def feed(self, chunk: str) -> List[Any]:
+        out: List[Any] = []
+        for ch in chunk:
+            if self._closed:
+                break
+            if not self._started:
+                if ch == "[": self._started = True
+                continue
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1; self._buf = [ch]
+                elif ch == "]":
+                    self._closed = True
+                continue
+            self._buf.append(ch)
+            if self._in_str:
+                if self._esc: self._esc = False
+                elif ch == "\\": self._esc = True
+                elif ch == '"': self._in_str = False
+                continue
+            if ch == '"':
+                self._in_str = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        out.append(json.loads("".join(self._buf)))
+                    except ValueError:
+                        pass
+                    self._buf = []
+        return out
+
+def _prompt(goal: m.Goal, req: WbsPlanRequest) -> str:
     deadline = goal.deadline.isoformat() if goal.deadline else "なし"
-    user = PROMPT_TEMPLATE.format(title=goal.title, why=goal.why or "", kgi=goal.kgi or "", deadline=deadline, max_tasks=req.max_tasks)
-    raw = generate_text(SYSTEM, user, max_tokens=800)
+    return PROMPT_TEMPLATE.format(title=goal.title, why=goal.why or "", kgi=goal.kgi or "", deadline=deadline, max_tasks=req.max_tasks)
+
+def _ai_generate(goal: m.Goal, req: WbsPlanRequest) -> Optional[List[WbsTask]]:
+    raw = generate_text(SYSTEM, _prompt(goal, req), max_tokens=800)
     if not raw:
         return None
     try:
@@ -57,26 +105,27 @@ def _rule_generate(goal: m.Goal, req: WbsPlanRequest) -> List[WbsTask]:
     ]
     return base[: req.max_tasks]
 
+def _due_at(i: int, n: int, start: date, end: date) -> date:
+    span = (end - start).days or 1
+    return start + timedelta(days=int(i * span / max(1, n - 1)))
+
 def _spread_due(items: List[WbsTask], start: date, end: date) -> None:
     if start > end or not items:
         return
-    span = (end - start).days or 1
-    n = len(items)
     for i, it in enumerate(items):
-        if it.due is not None:
-            continue
-        pos = int(i * span / max(1, n - 1))
-        it.due = start + timedelta(days=pos)
+        if it.due is None:
+            it.due = _due_at(i, len(items), start, end)
+
+def _clean(it: WbsTask) -> WbsTask:
+    eff = min(max(it.effort_min, 5), 120 if it.impact >= 4 else 60)
+    imp = min(max(it.impact, 1), 5)
+    return WbsTask(title=it.title.strip()[:200], effort_min=eff, impact=imp, due=it.due, prereq_ids=it.prereq_ids or [])
 
 def generate_wbs(db: Session, goal: m.Goal, req: WbsPlanRequest) -> List[WbsTask]:
     items = _ai_generate(goal, req)
     if not items:
         items = _rule_generate(goal, req)
-    cleaned: List[WbsTask] = []
-    for it in items[: req.max_tasks]:
-        eff = min(max(it.effort_min, 5), 120 if it.impact >= 4 else 60)
-        imp = min(max(it.impact, 1), 5)
-        cleaned.append(WbsTask(title=it.title.strip()[:200], effort_min=eff, impact=imp, due=it.due, prereq_ids=it.prereq_ids or []))
+    cleaned: List[WbsTask] = [_clean(it) for it in items[: req.max_tasks]]
     if goal.deadline and req.spread_until_deadline:
         today = date.today(); start = today; end = goal.deadline
         if end < start:
@@ -86,13 +135,55 @@ def generate_wbs(db: Session, goal: m.Goal, req: WbsPlanRequest) -> List[WbsTask
             _spread_due(cleaned, start, end)
     return cleaned
 
+def stream_wbs(goal: m.Goal, req: WbsPlanRequest) -> Iterator[WbsTask]:
+    """generate_wbs のストリーミング版。LLMの出力を逐次パースし、完成したタスクから順に返す。
+    総数が事前に分からないため、締切までの分散は max_tasks 件を前提に割り付ける。"""
+    def finish(it: WbsTask, i: int, n: int) -> WbsTask:
+        it = _clean(it)
+        if goal.deadline and req.spread_until_deadline and it.due is None:
+            today = date.today()
+            it.due = today if goal.deadline < today else _due_at(i, n, today, goal.deadline)
+        return it
+
+    parser = _JsonArrayParser()
+    n = 0
+    for piece in stream_text(SYSTEM, _prompt(goal, req), max_tokens=800):
+        for obj in parser.feed(piece):
+            if not isinstance(obj, dict) or n >= req.max_tasks:
+                continue
+            try:
+                it = WbsTask(**obj)
+            except Exception:
+                continue
+            yield finish(it, n, req.max_tasks); n += 1
+        if n >= req.max_tasks:
+            break
+    if n == 0:
+        rule = _rule_generate(goal, req)
+        for i, it in enumerate(rule):
+            yield finish(it, i, len(rule))
+
+def _existing_titles(db: Session, goal: m.Goal) -> Set[str]:
+    return set(t.strip() for t in db.execute(select(m.Task.title).where(m.Task.goal_id == goal.id)).scalars().all())
+
+def save_wbs_task(db: Session, goal: m.Goal, item: WbsTask, existing: Set[str]) -> bool:
+    title = item.title.strip()
+    if title in existing:
+        return False
+    db.add(m.Task(goal_id=goal.id, title=title, status="pending", impact=item.impact, effort_min=item.effort_min, due=item.due, parent_task_id=None))
+    bump_version(db, goal.user_id, GOALS)
+    db.commit(); existing.add(title)
+    return True
+
 def save_wbs_as_tasks(db: Session, goal: m.Goal, items: List[WbsTask]) -> int:
-    existing = set(t.title.strip() for t in db.execute(select(m.Task.title).where(m.Task.goal_id == goal.id)).scalars().all())
+    existing = _existing_titles(db, goal)
     count = 0
     for it in items:
         title = it.title.strip()
         if title in existing: continue
         task = m.Task(goal_id=goal.id, title=title, status="pending", impact=it.impact, effort_min=it.effort_min, due=it.due, parent_task_id=None)
         db.add(task); existing.add(title); count += 1
+    if count:
+        bump_version(db, goal.user_id, GOALS)
     db.commit()
     return count
@@ -6,7 +6,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy import select
 from app import models as m
 from app.services.plan import get_or_create_demo_user
-from app.services.coach import summarize_reflections
+from app.services.digests import summarize_window
+from app.services.versions import bump_version, REVIEW
 
 JST_OFFSET = 9
 
@@ -15,26 +16,24 @@ def jst_today() -> date_type:
     jst = now_utc + timedelta(hours=JST_OFFSET)
     return jst.date()
 
-def generate_weekly_payload(db: Session, days: int = 7) -> Dict[str, Any]:
-    user = get_or_create_demo_user(db)
+def generate_weekly_payload(db: Session, days: int = 7, user: m.User | None = None) -> Dict[str, Any]:
+    user = user or get_or_create_demo_user(db)
     today = jst_today()
     start = today - timedelta(days=days-1)
-    stmt = select(m.Reflection).where(m.Reflection.user_id == user.id).where(m.Reflection.date >= start).order_by(m.Reflection.date.desc(), m.Reflection.id.desc())
-    recs = db.execute(stmt).scalars().all()
-    items = [{"date": r.date.isoformat(), "text": r.text or "", "mood": r.mood or 3} for r in recs]
-    res = summarize_reflections(items, days=days)
-    payload = {"range": {"days": days, "start": start.isoformat(), "end": today.isoformat()}, "count": len(items), "summary": res["summary"], "improvements": res["improvements"], "generated_at": today.isoformat()}
+    res = summarize_window(db, user.id, start, days)
+    payload = {"range": {"days": days, "start": start.isoformat(), "end": today.isoformat()}, "count": res["count"], "summary": res["summary"], "improvements": res["improvements"], "generated_at": today.isoformat()}
     return payload
 
-def save_weekly_suggestion(db: Session, payload: Dict[str, Any]) -> m.Suggestion:
-    user = get_or_create_demo_user(db)
+def save_weekly_suggestion(db: Session, payload: Dict[str, Any], user: m.User | None = None) -> m.Suggestion:
+    user = user or get_or_create_demo_user(db)
     today = jst_today()
     sug = m.Suggestion(user_id=user.id, date=today, type="weekly", content_json=json.dumps(payload, ensure_ascii=False))
-    db.add(sug); db.commit(); db.refresh(sug)
+    db.add(sug); bump_version(db, user.id, REVIEW); db.commit(); db.refresh(sug)
     return sug
 
-def upsert_this_week(db: Session) -> m.Suggestion:
-    user = get_or_create_demo_user(db)
+def upsert_this_week(db: Session, user: m.User | None = None) -> m.Suggestion:
+    """user 省略時はデモユーザー。"""
+    user = user or get_or_create_demo_user(db)
     today = jst_today()
     dow = today.weekday()  # Mon=0
     sun_shift = (dow + 1) % 7
@@ -42,11 +41,11 @@ def upsert_this_week(db: Session) -> m.Suggestion:
     week_end = week_start + timedelta(days=6)
     stmt = select(m.Suggestion).where(m.Suggestion.user_id == user.id).where(m.Suggestion.type == "weekly").where(m.Suggestion.date >= week_start).where(m.Suggestion.date <= week_end).order_by(m.Suggestion.id.desc())
     existing = db.execute(stmt).scalars().first()
-    payload = generate_weekly_payload(db, days=7)
+    payload = generate_weekly_payload(db, days=7, user=user)
     if existing:
         existing.date = today
         existing.content_json = json.dumps(payload, ensure_ascii=False)
-        db.add(existing); db.commit(); db.refresh(existing)
+        db.add(existing); bump_version(db, user.id, REVIEW); db.commit(); db.refresh(existing)
         return existing
     else:
-        return save_weekly_suggestion(db, payload)
+        return save_weekly_suggestion(db, payload, user=user)
@@ -0,0 +1,67 @@
+"""スケジュールジョブ(週次レビュー)を実行する専用プロセス。Webプロセスはバックグラウンド処理をしない。
+
+    python -m app.worker
+
+複数起動してもよい。DBのリース(leases テーブル)を持つ1プロセスだけがスケジューラを動かし、
+リースが切れたら(停止・ハング)別のプロセスが引き継ぐ。
+"""
+from __future__ import annotations
+import logging
+import os
+import signal
+import socket
+import threading
+import uuid
+from app.core.db import SessionLocal
+from app.services.bootstrap import init_db
+from app.services.leases import acquire, release
+from app.services.scheduler import start_scheduler, stop_scheduler
+
+log = logging.getLogger("app.worker")
+
+WORKER_LEASE_NAME = "scheduler"
+WORKER_LEASE_TTL_SEC = float(os.getenv("WORKER_LEASE_TTL_SEC", "60"))
+WORKER_RENEW_SEC = float(os.getenv("WORKER_RENEW_SEC", "15"))
+
+def _try_lease(owner: str) -> bool:
+    db = SessionLocal()
+    try:
+        return acquire(db, WORKER_LEASE_NAME, owner, WORKER_LEASE_TTL_SEC)
+    except Exception:
+        log.exception("lease renewal failed")
+        return False
+    finally:
+        db.close()
+
+def run(stop: threading.Event) -> None:
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    leader = False
+    while not stop.is_set():
+        ok = _try_lease(owner)
+        if ok and not leader:
+            log.info("acquired scheduler lease as %s", owner)
+            start_scheduler(still_leader=lambda: _try_lease(owner)); leader = True
+        elif not ok and leader:
+            # リースを失った(他のプロセスが引き継いだ)。実行中のジョブは未着手のユーザーを飛ばして終わるので、
+            # 処理中の分だけ待ってから降りる(新しいリーダーと同時に同じユーザーを処理しない)
+            log.warning("lost scheduler lease; stopping scheduler")
+            stop_scheduler(cancel=True); leader = False
+        stop.wait(WORKER_RENEW_SEC)
+    if leader:
+        stop_scheduler()
+        db = SessionLocal()
+        try:
+            release(db, WORKER_LEASE_NAME, owner)
+        finally:
+            db.close()
+
+def main() -> None:
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    init_db()
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    run(stop)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""ベンチマーク一式(本体からは import しない)。
+
+    python -m bench.datagen --db storage/bench.db             # 合成データ(既定: 10k goals / 1M tasks / 500k reflections)
+    python -m bench.servers ics --port 8801 --latency-ms 80   # ICS の代用サーバー
+    python -m bench.servers llm --port 8802 --latency-ms 400  # OpenAI互換 LLM の代用サーバー
+    python -m bench.micro --db storage/bench.db               # サービス関数のマイクロベンチ
+    python -m bench.load --base-url http://127.0.0.1:8000     # /v1 全ルートへの並列負荷
+    python -m bench.startup --repeat 5                        # import app.main と最初の応答までの時間
+    python -m bench.serialize --db storage/bench.db           # 一覧APIの ORM+Pydantic と 列+orjson の比較
+
+結果はいずれも JSON(--out で保存)。回帰比較のベースラインとして使う。
+"""
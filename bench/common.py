@@ -0,0 +1,45 @@
+from __future__ import annotations
+import json
+import math
+import platform
+import sqlite3
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+def percentile(sorted_vals: List[float], p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = max(0, min(len(sorted_vals) - 1, math.ceil(p / 100 * len(sorted_vals)) - 1))
+    return sorted_vals[k]
+
+def summarize(latencies_ms: List[float], elapsed_sec: float | None = None, errors: int = 0) -> Dict[str, Any]:
+    vals = sorted(latencies_ms)
+    out = {
+        "count": len(vals), "errors": errors,
+        "p50_ms": round(percentile(vals, 50), 3), "p95_ms": round(percentile(vals, 95), 3),
+        "p99_ms": round(percentile(vals, 99), 3), "max_ms": round(vals[-1], 3) if vals else 0.0,
+        "mean_ms": round(sum(vals) / len(vals), 3) if vals else 0.0,
+    }
+    if elapsed_sec:
+        out["throughput_rps"] = round((len(vals) + errors) / elapsed_sec, 2)
+    return out
+
+def timeit(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    for _ in range(warmup):
+        fn()
+    lat = []
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); lat.append((time.perf_counter() - t) * 1000)
+    return summarize(lat)
+
+def environment() -> Dict[str, Any]:
+    return {"python": sys.version.split()[0], "sqlite": sqlite3.sqlite_version, "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+
+def emit(result: Dict[str, Any], out: str | None) -> None:
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
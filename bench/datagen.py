@@ -0,0 +1,97 @@
+"""合成データを storage/app.db と同じスキーマで作る。
+
+    python -m bench.datagen --db storage/bench.db --goals 10000 --tasks 1000000 --reflections 500000
+
+ユーザー1はデモユーザー(demo@example.com)なので、API 経由のベンチはそのユーザーの分を読む。
+FTS と日別集計は一括投入のあとに作り直す(行ごとのトリガーを避けるため)。
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+
+WORDS = ["英語", "勉強", "資料", "作成", "レビュー", "設計", "実装", "テスト", "読書", "ジム", "ランニング", "家計簿",
+         "プレゼン", "企画", "調査", "メール", "整理", "会議", "準備", "学習", "記事", "執筆", "英単語", "筋トレ"]
+MOODS_TEXT = ["集中できた", "眠かった", "少し進んだ", "予定通り", "遅れた", "気分が良い", "疲れた", "捗った"]
+AREAS = ["general", "career", "health", "study", "money"]
+STATUSES = ["pending"] * 6 + ["doing"] * 2 + ["done"] * 2
+CHUNK = 50_000
+
+def _title(rng: random.Random, n: int = 3) -> str:
+    return "".join(rng.choice(WORDS) for _ in range(n))
+
+def _chunks(rows_fn, total: int):
+    for start in range(0, total, CHUNK):
+        yield [rows_fn(i) for i in range(start + 1, min(total, start + CHUNK) + 1)]
+
+def generate(path: str, users: int, goals: int, tasks: int, reflections: int, days: int, seed: int) -> dict:
+    os.environ["DB_PATH"] = path
+    # DB_PATH を決めてから app を読み込む(エンジンは import 時に作られる)
+    from app.core.db import Base, engine
+    from app import models  # noqa: F401
+    from app.services.search import ensure_search_index
+    from app.services.reflection_stats import ensure_reflection_daily
+
+    if os.path.exists(path):
+        os.remove(path)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.utcnow().isoformat(sep=" ")
+    t0 = time.perf_counter()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF"); conn.execute("PRAGMA synchronous=OFF")
+    conn.executemany("INSERT INTO users (id, name, email) VALUES (?, ?, ?)",
+                     [(1, "Demo", "demo@example.com")] + [(i, f"user{i}", f"user{i}@example.com") for i in range(2, users + 1)])
+
+    def goal_row(i):
+        deadline = (today + timedelta(days=rng.randint(7, 365))).isoformat() if rng.random() < 0.7 else None
+        return (i, (i - 1) % users + 1, _title(rng), _title(rng, 6), _title(rng, 2), deadline, rng.choice(AREAS), now)
+    for rows in _chunks(goal_row, goals):
+        conn.executemany("INSERT INTO goals (id, user_id, title, why, kgi, deadline, area, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def task_row(i):
+        due = (today + timedelta(days=rng.randint(-10, 120))).isoformat() if rng.random() < 0.6 else None
+        return (i, rng.randint(1, goals), _title(rng), rng.choice(STATUSES), rng.randint(1, 5), rng.choice((10, 15, 20, 30, 45, 60, 90)), due, None)
+    for rows in _chunks(task_row, tasks):
+        conn.executemany("INSERT INTO tasks (id, goal_id, title, status, impact, effort_min, due, parent_task_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def reflection_row(i):
+        d = today - timedelta(days=rng.randint(0, days - 1))
+        text = f"{_title(rng, 2)}を{rng.randint(10, 90)}分。{rng.choice(MOODS_TEXT)}。{_title(rng, 4)}"
+        return (i, rng.randint(1, users), d.isoformat(), text, rng.randint(1, 5), now)
+    for rows in _chunks(reflection_row, reflections):
+        conn.executemany("INSERT INTO reflections (id, user_id, date, text, mood, created_at) VALUES (?, ?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    load_sec = time.perf_counter() - t0
+
+    t1 = time.perf_counter()
+    ensure_search_index(engine)
+    ensure_reflection_daily(engine)
+    with engine.begin() as c:
+        c.exec_driver_sql("ANALYZE")
+    engine.dispose()
+    conn.close()
+    return {"db": path, "users": users, "goals": goals, "tasks": tasks, "reflections": reflections,
+            "load_sec": round(load_sec, 2), "index_sec": round(time.perf_counter() - t1, 2)}
+
+def main() -> None:
+    from bench.common import emit
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="storage/bench.db")
+    ap.add_argument("--users", type=int, default=100)
+    ap.add_argument("--goals", type=int, default=10_000)
+    ap.add_argument("--tasks", type=int, default=1_000_000)
+    ap.add_argument("--reflections", type=int, default=500_000)
+    ap.add_argument("--days", type=int, default=365, help="振り返りを散らす日数")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out")
+    a = ap.parse_args()
+    emit(generate(a.db, a.users, a.goals, a.tasks, a.reflections, a.days, a.seed), a.out)
+
+if __name__ == "__main__":
+    main()
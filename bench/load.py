@@ -0,0 +1,174 @@
+"""起動済みサーバーの /v1 全ルートに並列で負荷をかけ、ルートごとの p50/p95/p99 とスループットを JSON で出す。
+
+    python -m bench.load --base-url http://127.0.0.1:8000 --concurrency 16 --requests 200 --out load.json
+
+削除系は計測外で作った行を消す(既存データは減らさない)。ICS 連携は代用サーバーに向け直すので bench 用DBで使う。
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from http.client import HTTPConnection
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import urlencode, urlsplit
+
+Request = Tuple[str, str, Any]  # (method, path, json body)
+
+class Client:
+    """スレッドごとに keep-alive の接続を1本持つ最小の HTTP クライアント。"""
+
+    def __init__(self, base_url: str, timeout: float = 60):
+        u = urlsplit(base_url)
+        self.host, self.port, self.timeout = u.hostname, u.port or 80, timeout
+        self._local = threading.local()
+
+    def _conn(self) -> HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def request(self, method: str, path: str, body: Any = None, headers: Dict[str, str] | None = None) -> Tuple[int, bytes, Dict[str, str]]:
+        data = json.dumps(body).encode() if body is not None else None
+        hdrs = {"Content-Type": "application/json", **(headers or {})} if data else dict(headers or {})
+        for attempt in (0, 1):
+            conn = self._conn()
+            try:
+                conn.request(method, path, body=data, headers=hdrs)
+                resp = conn.getresponse()
+                payload = resp.read()
+                if resp.getheader("Connection", "").lower() == "close":
+                    conn.close(); self._local.conn = None
+                return resp.status, payload, {k.lower(): v for k, v in resp.getheaders()}
+            except (ConnectionError, OSError):
+                conn.close(); self._local.conn = None
+                if attempt:
+                    raise
+        raise RuntimeError("unreachable")
+
+    def json(self, method: str, path: str, body: Any = None) -> Any:
+        status, payload, _ = self.request(method, path, body)
+        if status >= 400:
+            raise RuntimeError(f"{method} {path} -> {status}: {payload[:200]!r}")
+        return json.loads(payload) if payload else None
+
+def setup(c: Client, ics_url: str) -> Dict[str, Any]:
+    """計測に使う目標・タスクを用意し、ICS 連携を代用サーバーに向ける。"""
+    goal = c.json("POST", "/v1/goals", {"title": "ベンチ用の目標 英語の勉強", "why": "負荷試験", "kgi": "TOEIC 800",
+                                        "deadline": (date.today() + timedelta(days=60)).isoformat()})
+    c.json("POST", "/v1/tasks:batch", {"ops": [{"op": "create", "goal_id": goal["id"], "title": f"ベンチタスク{i}", "effort_min": 30} for i in range(50)]})
+    tasks = c.json("GET", f"/v1/goals/{goal['id']}/tasks?limit=50")
+    c.json("POST", "/v1/integration", {"kind": "gcal_ics", "value": ics_url})
+    c.json("POST", "/v1/reflect", {"text": "ベンチ: 集中して英語の勉強ができた", "mood": 4})
+    return {"goal_id": goal["id"], "task_ids": [t["id"] for t in tasks]}
+
+def _current_etag(path: str) -> Callable[[Client], Dict[str, str]]:
+    """直前の書き込みで古くならないよう、計測の直前に ETag を取り直す。"""
+    return lambda c: {"If-None-Match": c.request("GET", path)[2].get("etag", "")}
+
+def _q(path: str, **params) -> str:
+    return f"{path}?{urlencode(params)}"
+
+def routes(ctx: Dict[str, Any]) -> Dict[str, Tuple[Callable[[Client, random.Random], Request], Any]]:
+    """ルート名 -> (リクエストを作る関数, 追加ヘッダ または ヘッダを作る関数)。削除系の関数は計測外で対象を作ってから返す。"""
+    gid, tids = ctx["goal_id"], ctx["task_ids"]
+    today = date.today().isoformat()
+
+    def new_goal(c: Client, _r) -> Request:
+        g = c.json("POST", "/v1/goals", {"title": "消す目標"})
+        return ("DELETE", f"/v1/goals/{g['id']}", None)
+
+    def new_task(c: Client, _r) -> Request:
+        t = c.json("POST", f"/v1/goals/{gid}/tasks", {"title": "消すタスク"})
+        return ("DELETE", f"/v1/tasks/{t['id']}", None)
+
+    wbs = {"minutes_per_day": 90, "max_tasks": 8, "dry_run": True}
+    return {
+        "POST /v1/goals": (lambda c, r: ("POST", "/v1/goals", {"title": f"負荷目標{r.randint(0, 9999)}"}), {}),
+        "GET /v1/goals": (lambda c, r: ("GET", _q("/v1/goals", limit=50), None), {}),
+        "GET /v1/goals (304)": (lambda c, r: ("GET", _q("/v1/goals", limit=50), None), _current_etag(_q("/v1/goals", limit=50))),
+        "GET /v1/goals?q": (lambda c, r: ("GET", _q("/v1/goals", q="英語の勉強", limit=20), None), {}),
+        "GET /v1/goals/{goal_id}": (lambda c, r: ("GET", f"/v1/goals/{gid}", None), {}),
+        "PATCH /v1/goals/{goal_id}": (lambda c, r: ("PATCH", f"/v1/goals/{gid}", {"area": r.choice(["study", "general"])}), {}),
+        "DELETE /v1/goals/{goal_id}": (new_goal, {}),
+        "POST /v1/goals/{goal_id}/tasks": (lambda c, r: ("POST", f"/v1/goals/{gid}/tasks", {"title": "負荷タスク", "effort_min": 30}), {}),
+        "GET /v1/goals/{goal_id}/tasks": (lambda c, r: ("GET", _q(f"/v1/goals/{gid}/tasks", limit=100), None), {}),
+        "GET /v1/tasks/{task_id}": (lambda c, r: ("GET", f"/v1/tasks/{r.choice(tids)}", None), {}),
+        "PATCH /v1/tasks/{task_id}": (lambda c, r: ("PATCH", f"/v1/tasks/{r.choice(tids)}", {"impact": r.randint(1, 5)}), {}),
+        "DELETE /v1/tasks/{task_id}": (new_task, {}),
+        "POST /v1/tasks:batch": (lambda c, r: ("POST", "/v1/tasks:batch", {"ops": [{"op": "create", "goal_id": gid, "title": f"一括{i}"} for i in range(20)]}), {}),
+        "POST /v1/goals/{goal_id}/plan": (lambda c, r: ("POST", f"/v1/goals/{gid}/plan", wbs), {}),
+        "POST /v1/goals/{goal_id}/plan/stream": (lambda c, r: ("POST", f"/v1/goals/{gid}/plan/stream", wbs), {}),
+        "GET /v1/plan/today": (lambda c, r: ("GET", _q("/v1/plan/today", minutes_available=90), None), {}),
+        "GET /v1/plan/available_minutes": (lambda c, r: ("GET", _q("/v1/plan/available_minutes", date_str=today), None), {}),
+        "GET /v1/plan/available_minutes/range": (lambda c, r: ("GET", _q("/v1/plan/available_minutes/range", start=today), None), {}),
+        "POST /v1/reflect": (lambda c, r: ("POST", "/v1/reflect", {"text": "負荷: 少し進んだ", "mood": r.randint(1, 5)}), {}),
+        "GET /v1/reflect/recent": (lambda c, r: ("GET", _q("/v1/reflect/recent", days=30), None), {}),
+        "GET /v1/reflect/search": (lambda c, r: ("GET", _q("/v1/reflect/search", q="集中して", limit=20), None), {}),
+        "GET /v1/reflect/analyze": (lambda c, r: ("GET", _q("/v1/reflect/analyze", days=7), None), {}),
+        "GET /v1/review/weekly": (lambda c, r: ("GET", "/v1/review/weekly", None), {}),
+        "POST /v1/review/weekly/run": (lambda c, r: ("POST", "/v1/review/weekly/run", None), {}),
+        "POST /v1/integration": (lambda c, r: ("POST", "/v1/integration", {"kind": "gcal_ics", "value": ctx["ics_url"]}), {}),
+        "GET /v1/integration": (lambda c, r: ("GET", "/v1/integration", None), {}),
+    }
+
+def drive(c: Client, make: Callable, headers: Any, n: int, concurrency: int, seed: int) -> Dict[str, Any]:
+    from bench.common import summarize
+    lat: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    headers = headers(c) if callable(headers) else headers
+
+    def one(i: int) -> None:
+        nonlocal errors
+        ms = 0.0
+        try:
+            method, path, body = make(c, random.Random(seed + i))
+            t = time.perf_counter()
+            status, _, _ = c.request(method, path, body, headers)
+            ms = (time.perf_counter() - t) * 1000
+            ok = status < 400
+        except Exception:
+            ok = False
+        with lock:
+            if ok: lat.append(ms)
+            else: errors += 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(n)))
+    return summarize(lat, time.perf_counter() - t0, errors)
+
+def main() -> None:
+    from bench.common import emit, environment
+    from bench.servers import start_ics_server
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base-url", default="http://127.0.0.1:8000")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--requests", type=int, default=200, help="ルートごとのリクエスト数")
+    ap.add_argument("--routes", default=".*", help="対象ルート名の正規表現(例: '^GET ')")
+    ap.add_argument("--ics-url", help="省略時はこのプロセスで ICS の代用サーバーを起動する")
+    ap.add_argument("--ics-latency-ms", type=float, default=50)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--out")
+    a = ap.parse_args()
+    ics_url = a.ics_url or start_ics_server(latency_ms=a.ics_latency_ms)[0]
+    c = Client(a.base_url)
+    ctx = setup(c, ics_url); ctx["ics_url"] = ics_url
+    pattern = re.compile(a.routes)
+    results = {}
+    for name, (make, headers) in routes(ctx).items():
+        if pattern.search(name):
+            results[name] = drive(c, make, headers, a.requests, a.concurrency, a.seed)
+            print(f"{name}: {results[name]}", file=sys.stderr, flush=True)
+    emit({"kind": "load", "env": environment(), "base_url": a.base_url, "concurrency": a.concurrency,
+          "requests_per_route": a.requests, "results": results}, a.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""サービス関数のマイクロベンチ。ICS と LLM はプロセス内の代用サーバーに向ける。
+
+    python -m bench.micro --db storage/bench.db --repeat 20 --llm-latency-ms 300 --out micro.json
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+from datetime import date, timedelta
+
+def run(db_path: str, repeat: int, llm_latency_ms: float, ics_latency_ms: float) -> dict:
+    from bench.servers import start_ics_server, start_llm_server
+    from bench.common import timeit, environment
+    ics_url, _ = start_ics_server(latency_ms=ics_latency_ms)
+    llm_url, _ = start_llm_server(latency_ms=llm_latency_ms)
+    # 環境変数は app の import 前に決める(モジュール定数として読まれる)
+    os.environ.update(DB_PATH=db_path, AI_ENABLED="true", OPENAI_API_KEY="bench", OPENAI_BASE_URL=llm_url, LLM_CACHE_ENABLED="false")
+    from sqlalchemy import select
+    from app.core.db import SessionLocal
+    from app import models as m
+    from app.services import calendar, coach
+    from app.services.plan import pick_today_tasks, get_or_create_demo_user
+    from app.services.batch_plan import plan_for_users
+    from app.services.reflection_stats import window_stats
+    from app.services.digests import summarize_window
+
+    db = SessionLocal()
+    user = get_or_create_demo_user(db)
+    today = date.today()
+    items = [{"date": d.isoformat(), "text": t, "mood": mood} for d, t, mood in db.execute(
+        select(m.Reflection.date, m.Reflection.text, m.Reflection.mood).where(m.Reflection.user_id == user.id)
+        .where(m.Reflection.date >= today - timedelta(days=29)).order_by(m.Reflection.date.desc()))]
+    tasks = [(f"タスク{i}", 30) for i in range(3)]
+    user_ids = list(db.scalars(select(m.User.id).order_by(m.User.id).limit(100)))
+
+    def cold_free_minutes():
+        calendar.clear_feed_cache(); calendar.free_minutes_between(ics_url, today, "09:00", "18:00")
+
+    def cold_coach_lines():
+        coach._coach_memo.clear(); asyncio.run(coach.acoach_lines_for_tasks(tasks))
+
+    cases = {
+        "plan.pick_today_tasks": lambda: pick_today_tasks(db, user, 90, today),
+        "batch_plan.plan_for_users[100]": lambda: plan_for_users(db, user_ids, today=today),
+        "calendar.free_minutes_between.cold": cold_free_minutes,
+        "calendar.free_minutes_between.warm": lambda: calendar.free_minutes_between(ics_url, today, "09:00", "18:00"),
+        "calendar.free_blocks_range[7d].warm": lambda: calendar.free_blocks_range(ics_url, today, today + timedelta(days=6), "09:00", "18:00"),
+        "coach.acoach_lines_for_tasks.cold": cold_coach_lines,
+        "coach.summarize_reflections[30d]": lambda: coach.summarize_reflections(items, days=30),
+        "digests.summarize_window[30d].warm": lambda: summarize_window(db, user.id, today - timedelta(days=29), 30),
+        "reflection_stats.window_stats[365d]": lambda: window_stats(db, user.id, today - timedelta(days=364)),
+    }
+    results = {name: timeit(fn, repeat) for name, fn in cases.items()}
+    db.close()
+    return {"kind": "micro", "env": environment(), "db": db_path, "repeat": repeat,
+            "llm_latency_ms": llm_latency_ms, "ics_latency_ms": ics_latency_ms, "reflections_30d": len(items), "results": results}
+
+def main() -> None:
+    from bench.common import emit
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="storage/bench.db")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--llm-latency-ms", type=float, default=300)
+    ap.add_argument("--ics-latency-ms", type=float, default=50)
+    ap.add_argument("--out")
+    a = ap.parse_args()
+    emit(run(a.db, a.repeat, a.llm_latency_ms, a.ics_latency_ms), a.out)
+
+if __name__ == "__main__":
+    main()
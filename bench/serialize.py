@@ -0,0 +1,66 @@
+"""一覧APIのシリアライズ比較。ORM + Pydantic + json(response_model 経由)と、列タプル + orjson(app.services.listing)。
+
+    python -m bench.serialize --db storage/bench.db --rows 200 --repeat 50 --out serialize.json
+
+両方の経路でレスポンス本文を作り、同じバイト列であることを確かめてから時間を測る(SQL の実行を含む)。
+"""
+from __future__ import annotations
+import argparse
+import os
+
+def run(db_path: str, rows: int, repeat: int) -> dict:
+    from bench.common import timeit, environment
+    os.environ["DB_PATH"] = db_path
+    from typing import List
+    from pydantic import TypeAdapter
+    from sqlalchemy import func, select
+    from fastapi.responses import JSONResponse
+    from app.core.db import SessionLocal
+    from app import models as m
+    from app.schemas import GoalOut, TaskOut
+    from app.services.listing import GOAL_COLUMNS, GOAL_FIELDS, TASK_COLUMNS, TASK_FIELDS, rows_response
+
+    db = SessionLocal()
+    user_id = db.scalar(select(m.Goal.user_id).group_by(m.Goal.user_id).order_by(func.count().desc()).limit(1))
+    goal_id = db.scalar(select(m.Task.goal_id).group_by(m.Task.goal_id).order_by(func.count().desc()).limit(1))
+    if user_id is None or goal_id is None:
+        raise SystemExit("bench DB is empty: run python -m bench.datagen first")
+
+    def listing(model, columns, where, schema, fields):
+        adapter = TypeAdapter(List[schema])
+
+        def orm() -> bytes:
+            db.expunge_all()
+            objs = db.scalars(select(model).where(where).order_by(model.id.desc()).limit(rows)).all()
+            return JSONResponse(adapter.dump_python(adapter.validate_python(objs, from_attributes=True), mode="json")).body
+
+        def fast() -> bytes:
+            return rows_response(db.execute(select(*columns).where(where).order_by(model.id.desc()).limit(rows)).all(), fields).body
+        return orm, fast
+
+    cases = {
+        "goals": listing(m.Goal, GOAL_COLUMNS, m.Goal.user_id == user_id, GoalOut, GOAL_FIELDS),
+        "tasks": listing(m.Task, TASK_COLUMNS, m.Task.goal_id == goal_id, TaskOut, TASK_FIELDS),
+    }
+    results = {}
+    for name, (orm, fast) in cases.items():
+        body = orm()
+        if body != fast():
+            raise AssertionError(f"{name}: orjson body differs from response_model body")
+        results[name] = {"bytes": len(body), "orm_pydantic_json": timeit(orm, repeat), "columns_orjson": timeit(fast, repeat)}
+        results[name]["speedup_p50"] = round(results[name]["orm_pydantic_json"]["p50_ms"] / max(results[name]["columns_orjson"]["p50_ms"], 1e-6), 2)
+    db.close()
+    return {"kind": "serialize", "env": environment(), "db": db_path, "rows": rows, "repeat": repeat, "results": results}
+
+def main() -> None:
+    from bench.common import emit
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="storage/bench.db")
+    ap.add_argument("--rows", type=int, default=200, help="1回の一覧で返す行数(limit)")
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--out")
+    a = ap.parse_args()
+    emit(run(a.db, a.rows, a.repeat), a.out)
+
+if __name__ == "__main__":
+    main()
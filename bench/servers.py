@@ -0,0 +1,144 @@
+"""ベンチ用の代用サーバー(ICS 配信 / OpenAI 互換 LLM)。遅延と失敗率を指定できる。
+
+    python -m bench.servers ics --port 8801 --latency-ms 80 --events-per-day 4
+    python -m bench.servers llm --port 8802 --latency-ms 400 --fail-rate 0.05
+
+LLM は AI_ENABLED=true OPENAI_API_KEY=dummy OPENAI_BASE_URL=http://127.0.0.1:8802/v1 で向ける。
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+def _sleep(latency_ms: float, jitter: float = 0.2) -> None:
+    if latency_ms > 0:
+        time.sleep(latency_ms / 1000 * random.uniform(1 - jitter, 1 + jitter))
+
+def make_ics(days: int = 60, events_per_day: int = 4, seed: int = 1) -> str:
+    """今日の前後 days 日に、JST 8〜20時の予定を1日 events_per_day 件ずつ置いた VCALENDAR。"""
+    rng = random.Random(seed)
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//bench//ics//JA"]
+    start = date.today() - timedelta(days=days // 2)
+    for d in range(days):
+        day = start + timedelta(days=d)
+        for k in range(events_per_day):
+            begin = datetime(day.year, day.month, day.day, rng.randint(8, 19), rng.choice((0, 15, 30, 45))) - timedelta(hours=9)
+            end = begin + timedelta(minutes=rng.choice((15, 30, 60, 90)))
+            lines += ["BEGIN:VEVENT", f"UID:{day.isoformat()}-{k}@bench", f"DTSTAMP:{begin:%Y%m%dT%H%M%SZ}",
+                      f"DTSTART:{begin:%Y%m%dT%H%M%SZ}", f"DTEND:{end:%Y%m%dT%H%M%SZ}", f"SUMMARY:予定{k}", "END:VEVENT"]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    cfg: dict = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, ctype: str, headers: dict | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+class IcsHandler(_Handler):
+    def do_GET(self):
+        _sleep(self.cfg["latency_ms"])
+        body, etag = self.cfg["body"], self.cfg["etag"]
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", "text/calendar", {"ETag": etag})
+        self._send(200, body, "text/calendar; charset=utf-8", {"ETag": etag})
+
+_numbered = re.compile(r"^(\d+)\.\s", re.M)
+
+def _reply(user: str) -> str:
+    """プロンプトの形に合わせてそれらしい応答を返す(番号付き一覧 / WBS の JSON 配列 / 要約)。"""
+    if "JSON配列" in user:
+        return json.dumps([{"title": f"ステップ{i + 1}", "effort_min": 30, "impact": 3, "due": None, "prereq_ids": []} for i in range(5)], ensure_ascii=False)
+    nums = _numbered.findall(user)
+    if nums:
+        return "\n".join(f"{n}. まず5分だけ手をつける" for n in nums)
+    if "要約" in user:
+        return "- 小さく始めると進んだ\n- 夜は集中が切れやすい\n改善案\n- 朝に5分着手\n- 粒度を30分に\n- 締切を前倒し"
+    return "まず2分だけ、見出しを書こう。"
+
+class LlmHandler(_Handler):
+    def do_POST(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        req = json.loads(self.rfile.read(n) or b"{}")
+        _sleep(self.cfg["latency_ms"])
+        if random.random() < self.cfg["fail_rate"]:
+            return self._send(500, b'{"error":{"message":"bench: injected failure"}}', "application/json")
+        text = _reply((req.get("messages") or [{}])[-1].get("content", ""))
+        model = req.get("model", "bench")
+        if req.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for i in range(0, len(text), 8):
+                chunk = {"id": "bench", "object": "chat.completion.chunk", "created": 0, "model": model,
+                         "choices": [{"index": 0, "delta": {"content": text[i:i + 8]}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode()); self.wfile.flush()
+                _sleep(self.cfg["chunk_ms"], 0)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+            return
+        body = {"id": "bench", "object": "chat.completion", "created": 0, "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}}
+        self._send(200, json.dumps(body, ensure_ascii=False).encode(), "application/json")
+
+def _serve(handler: type, cfg: dict, port: int, background: bool) -> Tuple[str, ThreadingHTTPServer]:
+    server = ThreadingHTTPServer(("127.0.0.1", port), type(handler.__name__, (handler,), {"cfg": cfg}))
+    server.daemon_threads = True
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}", server
+
+def start_ics_server(port: int = 0, latency_ms: float = 0, days: int = 60, events_per_day: int = 4,
+                     background: bool = True) -> Tuple[str, ThreadingHTTPServer]:
+    """(URL, server) を返す。URL はそのまま ICS の購読URLとして使える。"""
+    body = make_ics(days, events_per_day).encode("utf-8")
+    cfg = {"latency_ms": latency_ms, "body": body, "etag": '"' + hashlib.sha1(body).hexdigest() + '"'}
+    url, server = _serve(IcsHandler, cfg, port, background)
+    return url + "/calendar.ics", server
+
+def start_llm_server(port: int = 0, latency_ms: float = 0, fail_rate: float = 0.0, chunk_ms: float = 20,
+                     background: bool = True) -> Tuple[str, ThreadingHTTPServer]:
+    """(OPENAI_BASE_URL に渡す URL, server) を返す。"""
+    url, server = _serve(LlmHandler, {"latency_ms": latency_ms, "fail_rate": fail_rate, "chunk_ms": chunk_ms}, port, background)
+    return url + "/v1", server
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("kind", choices=["ics", "llm"])
+    ap.add_argument("--port", type=int, default=0)
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="llm: 500 を返す割合")
+    ap.add_argument("--events-per-day", type=int, default=4, help="ics: 1日あたりの予定数")
+    ap.add_argument("--days", type=int, default=60, help="ics: 予定を置く日数")
+    a = ap.parse_args()
+    if a.kind == "ics":
+        url, server = start_ics_server(a.port, a.latency_ms, a.days, a.events_per_day, background=False)
+    else:
+        url, server = start_llm_server(a.port, a.latency_ms, a.fail_rate, background=False)
+    print(url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
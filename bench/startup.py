@@ -0,0 +1,73 @@
+"""起動時間のベンチ。`import app.main` の時間と、uvicorn 起動から最初のリクエストに応答するまでの時間を測る。
+
+    python -m bench.startup --repeat 5 --out startup.json
+
+どちらも毎回新しいプロセスで測る(import のキャッシュを効かせない)。重い依存が import 時に読まれていないかも確認する。
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.request import urlopen
+
+LAZY_MODULES = ("ics", "requests", "apscheduler", "openai", "numpy")
+
+_IMPORT_PROBE = (
+    "import json, sys, time; t = time.perf_counter(); import app.main; dt = time.perf_counter() - t; "
+    f"print(json.dumps({{'sec': dt, 'loaded': [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))"
+)
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def measure_import(env: dict) -> dict:
+    out = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def measure_first_request(env: dict, timeout: float = 60) -> float:
+    """uvicorn を起動してから /healthz が 200 を返すまでの秒数(lifespan の初期化を含む)。"""
+    port = _free_port()
+    t = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - t < timeout:
+            try:
+                with urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - t
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError("server did not become ready")
+    finally:
+        proc.terminate(); proc.wait(10)
+
+def run(repeat: int, db_path: str | None) -> dict:
+    from bench.common import summarize, environment
+    with tempfile.TemporaryDirectory() as tmp:
+        envs = [{**os.environ, "DB_PATH": db_path or os.path.join(tmp, f"startup{i}.db")} for i in range(repeat)]
+        imports = [measure_import(env) for env in envs]
+        first = [measure_first_request(env) for env in envs]
+    return {"kind": "startup", "env": environment(), "repeat": repeat,
+            "import_app_main": summarize([x["sec"] * 1000 for x in imports]),
+            "time_to_first_request": summarize([x * 1000 for x in first]),
+            "heavy_modules_loaded_at_import": imports[-1]["loaded"]}
+
+def main() -> None:
+    from bench.common import emit
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--db", help="省略時は毎回空の一時DB(初回起動の create_all を含む)")
+    ap.add_argument("--out")
+    a = ap.parse_args()
+    emit(run(a.repeat, a.db), a.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""ホットなクエリの EXPLAIN QUERY PLAN を確認する。想定のインデックスを使っていない・テーブルをフルスキャンする・
+想定外の一時B-treeでソートするクエリがあれば非0で終了する。
+
+    python scripts/explain_hot_queries.py            # モデル定義から作った一時DBで確認
+    python scripts/explain_hot_queries.py --db storage/app.db   # 既存DB(マイグレーション適用後)で確認
+"""
+from __future__ import annotations
+import argparse
+import os
+import re
+import sys
+import tempfile
+from datetime import date
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, event, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from app.core.db import Base, _ln  # noqa: E402
+from app import models as m  # noqa: E402
+from app.services.plan import _score_sql  # noqa: E402
+
+TODAY = date(2026, 1, 1)
+
+def hot_queries() -> Dict[str, Tuple[object, Tuple[str, ...], bool]]:
+    """名前 -> (クエリ, 使うべきインデックス, ORDER BY の一時B-treeを許すか)。"""
+    score = _score_sql(TODAY).label("score")
+    return {
+        "reflections.window": (select(m.Reflection).where(m.Reflection.user_id == 1).where(m.Reflection.date >= TODAY)
+            .order_by(m.Reflection.date.desc(), m.Reflection.id.desc()), ("ix_reflections_user_date",), False),
+        "suggestions.latest_weekly": (select(m.Suggestion).where(m.Suggestion.user_id == 1).where(m.Suggestion.type == "weekly")
+            .order_by(m.Suggestion.id.desc()), ("ix_suggestions_user_id",), False),
+        # 1週間分(数行)を id 順に並べ替えるだけなので一時B-treeは許す
+        "suggestions.this_week": (select(m.Suggestion).where(m.Suggestion.user_id == 1).where(m.Suggestion.type == "weekly")
+            .where(m.Suggestion.date >= TODAY).where(m.Suggestion.date <= TODAY).order_by(m.Suggestion.id.desc()),
+            ("ix_suggestions_user_type_date",), True),
+        "tasks.by_goal_status": (select(m.Task).where(m.Task.goal_id == 1).where(m.Task.status == "pending").order_by(m.Task.id.desc()),
+            ("ix_tasks_goal_status",), False),
+        # スコアは式なのでソートは避けられない
+        "tasks.today_ranking": (select(m.Task.id, m.Task.effort_min, score).join(m.Goal, m.Task.goal_id == m.Goal.id)
+            .where(m.Goal.user_id == 1).where(m.Task.status != "done").order_by(score.desc(), m.Task.id).limit(16),
+            ("ix_goals_user_id", "ix_tasks_goal_id"), True),
+        "goals.by_user": (select(m.Goal).where(m.Goal.user_id == 1).order_by(m.Goal.id.desc()).limit(50), ("ix_goals_user_id",), False),
+        "integrations.ics": (select(m.Integration).where(m.Integration.user_id == 1, m.Integration.kind == "gcal_ics", m.Integration.key == "default"),
+            ("ix_integrations_user_kind_key",), False),
+        "reflection_daily.window": (select(m.ReflectionDaily.latest_id, m.ReflectionDaily.date).where(m.ReflectionDaily.user_id == 1)
+            .where(m.ReflectionDaily.date >= TODAY).order_by(m.ReflectionDaily.date.desc()).limit(1),
+            ("sqlite_autoindex_reflection_daily_1",), False),
+        "cache_versions.get": (select(m.CacheVersion.version).where(m.CacheVersion.user_id == 1, m.CacheVersion.resource == "goals"),
+            ("sqlite_autoindex_cache_versions_1",), False),
+    }
+
+_full_scan = re.compile(r"^SCAN (\w+)(?! USING (COVERING )?INDEX)")
+_temp_sort = "USE TEMP B-TREE FOR ORDER BY"
+
+def plan_problems(conn, stmt, indexes: Tuple[str, ...], sort_ok: bool) -> List[str]:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    try:
+        plan = [r[-1] for r in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql).all()]
+    except OperationalError as e:  # テーブル・列が無い(マイグレーション未適用)
+        return [str(e.orig)]
+    problems = [p for p in plan if _full_scan.match(p) or (not sort_ok and p.startswith(_temp_sort))]
+    for ix in indexes:
+        if not any(re.search(rf"USING (COVERING )?INDEX {ix}\b", p) for p in plan):
+            problems.append(f"{ix} not used: {' / '.join(plan)}")
+    return problems
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", help="確認するSQLiteファイル(省略時はモデル定義から一時DBを作る)")
+    args = ap.parse_args()
+    tmpdir = None
+    path = args.db
+    if not path:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmpdir.name, "explain.db")
+    engine = create_engine(f"sqlite:///{path}")
+    event.listen(engine, "connect", lambda dbapi_conn, _record: dbapi_conn.create_function("ln", 1, _ln, deterministic=True))
+    if tmpdir:
+        Base.metadata.create_all(engine)
+    failed = 0
+    with engine.connect() as conn:
+        for name, (stmt, indexes, sort_ok) in hot_queries().items():
+            problems = plan_problems(conn, stmt, indexes, sort_ok)
+            print(f"{'NG' if problems else 'ok'}  {name}" + (f"  ({'; '.join(problems)})" if problems else ""))
+            failed += bool(problems)
+    engine.dispose()
+    if tmpdir:
+        tmpdir.cleanup()
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
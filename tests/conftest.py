@@ -0,0 +1,36 @@
+from __future__ import annotations
+import os
+import sys
+import tempfile
+
+# app の設定はモジュール定数として import 時に読まれるので、import より前に一時ディレクトリへ向ける
+_tmp = tempfile.mkdtemp(prefix="pmcoach-test-")
+os.environ["DB_PATH"] = os.path.join(_tmp, "app.db")
+os.environ["LLM_CACHE_PATH"] = os.path.join(_tmp, "llm_cache.db")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest  # noqa: E402
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    with TestClient(app) as c:
+        yield c
+
+@pytest.fixture
+def llm(monkeypatch):
+    """代用の LLM サーバーに向け、応答キャッシュを有効にする。"""
+    from bench.servers import start_llm_server
+    from app.core import ai, llm_cache
+    url, server = start_llm_server(chunk_ms=0)
+    monkeypatch.setattr(ai, "AI_ENABLED", True)
+    monkeypatch.setattr(ai, "LLM_PROVIDER", "openai")
+    monkeypatch.setattr(ai, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(ai, "OPENAI_BASE_URL", url)
+    monkeypatch.setattr(ai, "_client", None)
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", True)
+    llm_cache.clear(); ai.breaker.reset()
+    yield url
+    server.shutdown(); server.server_close()
+    llm_cache.clear(); ai.breaker.reset()
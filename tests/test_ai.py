@@ -0,0 +1,21 @@
+from app.core import ai, llm_cache
+
+def test_stream_closed_early_is_not_cached(llm):
+    key = llm_cache.cache_key(ai.LLM_PROVIDER, ai.OPENAI_MODEL, "s", "hello", 50)
+    stream = ai.stream_text("s", "hello", 50)
+    next(stream); stream.close()
+    assert llm_cache.get(key) is None
+    assert ai.breaker.state == "closed"
+
+def test_stream_completed_is_cached(llm):
+    key = llm_cache.cache_key(ai.LLM_PROVIDER, ai.OPENAI_MODEL, "s", "hello", 50)
+    text = "".join(ai.stream_text("s", "hello", 50))
+    assert text and llm_cache.get(key) == text
+
+def test_half_open_trial_is_settled_on_early_close(llm, monkeypatch):
+    monkeypatch.setattr(ai.breaker, "cooldown_sec", 0)
+    for _ in range(ai.breaker.failure_threshold):
+        ai.breaker.record_failure()
+    stream = ai.stream_text("s", "hello", 50)
+    next(stream); stream.close()
+    assert ai.breaker.allow()
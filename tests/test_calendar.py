@@ -0,0 +1,50 @@
+import threading
+from datetime import date
+from app.services import calendar as cal
+
+def _serve_counting(latency_ms: float):
+    """ICS の代用サーバー。URL(パス)ごとの同時取得数の最大値を数える。"""
+    from bench.servers import start_ics_server
+    url, server = start_ics_server(latency_ms=latency_ms)
+    handler, state, lock = server.RequestHandlerClass, {"now": {}, "max": {}, "hits": {}}, threading.Lock()
+    orig = handler.do_GET
+
+    def do_GET(self):
+        with lock:
+            n = state["now"][self.path] = state["now"].get(self.path, 0) + 1
+            state["max"][self.path] = max(state["max"].get(self.path, 0), n)
+            state["hits"][self.path] = state["hits"].get(self.path, 0) + 1
+        try:
+            orig(self)
+        finally:
+            with lock:
+                state["now"][self.path] -= 1
+    handler.do_GET = do_GET
+    return url.rsplit("/", 1)[0], server, state
+
+def _run(fn, n):
+    threads = [threading.Thread(target=fn) for _ in range(n)]
+    [t.start() for t in threads]; [t.join() for t in threads]
+
+def test_concurrent_cold_requests_fetch_once():
+    base, server, state = _serve_counting(200)
+    cal.clear_feed_cache()
+    try:
+        _run(lambda: cal.free_minutes_between(f"{base}/a.ics", date.today(), "09:00", "18:00"), 16)
+        assert state["hits"]["/a.ics"] == 1
+    finally:
+        server.shutdown(); server.server_close()
+
+def test_eviction_keeps_the_fetch_lock_of_a_waiting_request(monkeypatch):
+    # ロックを受け取って取得待ちのリクエストがいる間に、そのフィードが LRU から追い出されても
+    # 後から来たリクエストは同じロックを使う(別のロックだと同じURLを並行して取得してしまう)
+    monkeypatch.setattr(cal, "ICS_CACHE_MAX_FEEDS", 1)
+    cal.clear_feed_cache()
+    try:
+        waiting = cal._fetch_lock("http://x/a.ics")
+        cal._cache_put("http://x/a.ics", cal._Feed([], None, None, 0.0))
+        cal._cache_put("http://x/b.ics", cal._Feed([], None, None, 0.0))
+        assert "http://x/a.ics" not in cal._feeds
+        assert cal._fetch_lock("http://x/a.ics") is waiting
+    finally:
+        cal.clear_feed_cache()
@@ -0,0 +1,23 @@
+import asyncio
+from app.core import ai
+from app.services import coach
+
+def _lines(tasks):
+    return asyncio.run(coach.acoach_lines_for_tasks(tasks))
+
+def test_fallback_line_is_the_same_for_single_and_batched_chunks(monkeypatch):
+    monkeypatch.setattr(ai, "AI_ENABLED", False)
+    coach._coach_memo.clear()
+    single = _lines([("報告書を書く", 30)])
+    batched = _lines([("報告書を書く", 30), ("メールを返す", 10), ("設計を見直す", 60)])
+    assert single[0] == batched[0] == batched[1] == batched[2]
+    assert not coach._coach_memo
+
+def test_provider_output_is_memoized_after_recovery(llm, monkeypatch):
+    coach._coach_memo.clear()
+    monkeypatch.setattr(ai, "OPENAI_BASE_URL", "http://127.0.0.1:9/v1"); monkeypatch.setattr(ai, "_client", None)
+    failed = _lines([("報告書を書く", 30)])
+    assert not coach._coach_memo
+    monkeypatch.setattr(ai, "OPENAI_BASE_URL", llm); monkeypatch.setattr(ai, "_client", None); ai.breaker.reset()
+    recovered = _lines([("報告書を書く", 30)])
+    assert recovered != failed and coach._coach_memo[("報告書を書く", 30)] == recovered[0]
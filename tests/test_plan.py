@@ -0,0 +1,31 @@
+from datetime import date
+import pytest
+
+RANGE = "/v1/plan/available_minutes/range"
+
+@pytest.fixture
+def ics(client):
+    from bench.servers import start_ics_server
+    url, server = start_ics_server()
+    client.post("/v1/integration", json={"kind": "gcal_ics", "value": url})
+    yield url
+    server.shutdown(); server.server_close()
+
+@pytest.mark.parametrize("params", [
+    {"start": "bogus"},
+    {"start": "2026-01-01", "end": "2026-13-01"},
+    {"start": "2026-01-01", "work_start": "7am"},
+    {"start": "2026-01-01", "work_end": "24:00"},
+])
+def test_range_rejects_malformed_params(client, params):
+    assert client.get(RANGE, params=params).status_code == 422
+
+def test_range_rejects_reversed_and_long_ranges(client):
+    assert client.get(RANGE, params={"start": "2026-01-10", "end": "2026-01-01"}).status_code == 400
+    assert client.get(RANGE, params={"start": "2026-01-01", "end": "2026-12-31"}).status_code == 400
+
+def test_range_defaults_to_seven_days(client, ics):
+    start = date.today().isoformat()
+    body = client.get(RANGE, params={"start": start, "work_start": "09:00", "work_end": "18:00"}).json()
+    assert body["start"] == start and len(body["days"]) == 7
+    assert body["total_minutes"] == sum(d["available_minutes"] for d in body["days"])
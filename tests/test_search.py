@@ -0,0 +1,37 @@
+def _pages(client, path, params):
+    rows, cursor = [], None
+    while True:
+        r = client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        rows += r.json(); cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            return rows
+
+def test_goal_search_pages_follow_rank_order(client):
+    for title in ("report report report", "write the report", "a long title that mentions report only once", "report"):
+        client.post("/v1/goals", json={"title": title})
+    full = client.get("/v1/goals", params={"q": "report", "limit": 50}).json()
+    assert [g["id"] for g in _pages(client, "/v1/goals", {"q": "report", "limit": 1})] == [g["id"] for g in full]
+
+def test_reflection_search_cursor(client):
+    for i in range(3):
+        client.post("/v1/reflect", json={"text": f"集中して作業できた {i}", "mood": 3})
+    rows = _pages(client, "/v1/reflect/search", {"q": "集中して", "limit": 1})
+    assert len(rows) >= 3 and len({r["id"] for r in rows}) == len(rows)
+
+def test_invalid_cursor_is_400(client):
+    assert client.get("/v1/goals", params={"cursor": "!!"}).status_code == 400
+    assert client.get("/v1/reflect/search", params={"q": "集中して", "cursor": "!!"}).status_code == 400
+
+def test_short_goal_query_matches_the_same_columns_as_fts(client):
+    why = client.post("/v1/goals", json={"title": "目標A", "why": "転職に備える"}).json()["id"]
+    kgi = client.post("/v1/goals", json={"title": "目標B", "kgi": "月20本の記事"}).json()["id"]
+    # 2文字は LIKE、3文字以上は FTS。どちらも title 以外の列に一致する
+    assert why in [g["id"] for g in client.get("/v1/goals", params={"q": "転職"}).json()]
+    assert why in [g["id"] for g in client.get("/v1/goals", params={"q": "転職に"}).json()]
+    assert kgi in [g["id"] for g in client.get("/v1/goals", params={"q": "記事"}).json()]
+    assert kgi in [g["id"] for g in client.get("/v1/goals", params={"q": "本の記事"}).json()]
+
+def test_short_query_escapes_like_wildcards(client):
+    client.post("/v1/goals", json={"title": "達成率100%"})
+    assert all("%" in g["title"] for g in client.get("/v1/goals", params={"q": "%"}).json())